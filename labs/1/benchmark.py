@@ -0,0 +1,161 @@
+from synthetic import SyntheticGenerator
+from graph import Graph
+from parser import Parser
+from solver import Solver, SolveType
+from generator import Generator
+from tictactoe import TileState
+from typing import Callable, Dict, List
+from tempfile import TemporaryDirectory
+from time import perf_counter, strftime
+from statistics import median
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+
+
+class Benchmark:
+    """
+    Benchmark times the parser, solver and generator on synthetic DAGs.
+    Every DAG is written to a file and parsed back, the generated DAG is
+    solved with and without pruning, and the tic tac toe graph is generated.
+    Every timing is repeated, and the minimum and median are kept, since
+    the minimum is the least noisy and the median shows how noisy it was.
+    The DAGs come from fixed seeds, so every run times the same work
+    """
+
+    # name -> SyntheticGenerator arguments
+    workloads: Dict[str, dict] = {
+        'tree': {'depth': 9, 'branching': 3, 'sharing': 0.0},
+        'shared': {'depth': 11, 'branching': 3, 'sharing': 0.5},
+        'wide': {'depth': 4, 'branching': 12, 'sharing': 0.3,
+                 'values': 'outcome'},
+    }
+
+    def __init__(self, repeat: int = 5) -> None:
+        self._repeat = repeat
+
+    def run(self) -> dict:
+        """
+        Runs every benchmark, returns the results ready to be dumped as json
+        """
+        results = []
+        sizes = {}
+        with TemporaryDirectory() as directory:
+            for name, workload in self.workloads.items():
+                graph = SyntheticGenerator(**workload).generate_graph()
+                sizes[name] = len(graph)
+                results.extend(self._run_workload(name, graph, directory))
+        results.append(self._time(
+            'generate', 'tic tac toe',
+            lambda: Generator(TileState.X).generate()))
+        return {
+            'date': strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': self._repeat,
+            'workloads': self.workloads,
+            'nodes': sizes,
+            'results': results
+        }
+
+    def _run_workload(self, name: str, graph: Graph,
+                      directory: str) -> List[dict]:
+        """
+        Times writing and parsing one synthetic DAG, and solving it
+        """
+        filename = os.path.join(directory, name + '.txt')
+        results = [self._time('write', name,
+                              lambda: Parser().write_to_file(graph, filename))]
+        results.append(self._time(
+            'parse', name, lambda: Parser().generate_from_file(filename)))
+        # Solve the generated graph rather than the parsed one, so what
+        # gets solved doesn't depend on the parser
+        root = graph.root
+        results.append(self._time(
+            'minimax', name,
+            lambda: Solver().solve(root, SolveType.MAX, False)))
+        results.append(self._time(
+            'alpha beta', name,
+            lambda: Solver().solve(root, SolveType.MAX, True)))
+        return results
+
+    def _time(self, name: str, workload: str,
+              function: Callable[[], object]) -> dict:
+        """
+        Calls function repeat times and records how long each call took
+        """
+        times = []
+        for _ in range(self._repeat):
+            gc.collect()
+            start = perf_counter()
+            function()
+            times.append(perf_counter() - start)
+        return {'name': name, 'workload': workload, 'min': min(times),
+                'median': median(times), 'times': times}
+
+    @staticmethod
+    def compare(results: dict, baseline: dict,
+                threshold: float) -> List[str]:
+        """
+        Compares the minimum times of two runs. Returns a line for every
+        benchmark, and marks the ones that got slower than baseline by
+        more than the threshold ratio as regressions
+        """
+        old = {(x['name'], x['workload']): x['min']
+               for x in baseline['results']}
+        lines = []
+        for result in results['results']:
+            before = old.get((result['name'], result['workload']))
+            if before is None:
+                continue
+            ratio = result['min'] / before if before > 0 else 1.0
+            lines.append('{:<10} {:<12} {:10.6f}s {:10.6f}s {:6.2f}x{}'.format(
+                result['name'], result['workload'], before, result['min'],
+                ratio, '  REGRESSION' if ratio > threshold else ''))
+        return lines
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Times the parser, solver and generator on fixed '
+        'synthetic DAGs and writes the results as json'
+    )
+    parser.add_argument('output', help='File to write the json results to')
+    parser.add_argument(
+        '-r',
+        '--repeat',
+        help='Number of times every benchmark is run. Default is 5',
+        type=int,
+        default=5)
+    parser.add_argument(
+        '-c',
+        '--compare',
+        help='Results of an earlier run to compare against. Exits with 1 '
+             'if anything got slower than --threshold allows',
+        default=None)
+    parser.add_argument(
+        '-t',
+        '--threshold',
+        help='How many times slower than the earlier run a benchmark can '
+             'get before it counts as a regression. Default is 1.2',
+        type=float,
+        default=1.2)
+    args = parser.parse_args()
+    results = Benchmark(args.repeat).run()
+    with open(args.output, 'w') as file:
+        json.dump(results, file, indent=2)
+    if args.compare is None:
+        for result in results['results']:
+            print('{:<10} {:<12} {:10.6f}s'.format(
+                result['name'], result['workload'], result['min']))
+    else:
+        with open(args.compare, 'r') as file:
+            baseline = json.load(file)
+        lines = Benchmark.compare(results, baseline, args.threshold)
+        for line in lines:
+            print(line)
+        if any(line.endswith('REGRESSION') for line in lines):
+            sys.exit(1)
@@ -0,0 +1,218 @@
+from node import Node
+from graph import Graph, GraphNode
+from parser import Parser, ParserException
+from typing import List, Union
+from array import array
+from mmap import mmap, ACCESS_READ
+from os import fstat
+import argparse
+import struct
+import sys
+
+
+class BinaryGraph(Graph):
+    """
+    BinaryGraph is a Graph loaded from the binary format, with every
+    array still backed by the memory mapped file
+    """
+
+    def __init__(self, file_map: mmap, num_nodes: int, num_edges: int,
+                 num_labels: int, num_label_bytes: int,
+                 filename: str = None) -> None:
+        view = memoryview(file_map)
+        sections = BinaryParser.layout(
+            num_nodes, num_edges, num_labels, num_label_bytes)
+        # Sections are padded to 8 bytes, so they are cut to their real
+        # length rather than to the start of the next section
+        self._views = [
+            view[sections[0]:sections[0] + 8 * (num_nodes + 1)].cast('Q'),
+            view[sections[1]:sections[1] + 4 * num_edges].cast('I'),
+            view[sections[2]:sections[2] + 8 * num_nodes].cast('q'),
+            view[sections[3]:sections[3] + 4 * num_nodes].cast('I'),
+            view[sections[4]:sections[4] + 8 * (num_labels + 1)].cast('Q'),
+            view[sections[5]:sections[6]]
+        ]
+        view.release()
+        self._map = file_map
+        self._filename = filename
+        labels = BinaryLabels(self._views[4], self._views[5])
+        super().__init__(*self._views[:4], labels)
+
+    def close(self) -> None:
+        """
+        Releases the memory map. Nodes from this graph can't be used after
+        """
+        for view in self._views:
+            view.release()
+        self._map.close()
+
+    def __reduce__(self) -> tuple:
+        """
+        Other processes map the file again instead of copying the graph
+        """
+        if self._filename is None:
+            raise TypeError('BinaryGraph without a file can not be pickled')
+        return BinaryParser.load, (BinaryParser(), self._filename)
+
+    def __enter__(self) -> 'BinaryGraph':
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+
+
+class BinaryLabels:
+    """
+    BinaryLabels is the label table of a BinaryGraph.
+    Labels are only decoded when they are looked up
+    """
+
+    def __init__(self, offsets: memoryview, data: memoryview) -> None:
+        self._offsets = offsets
+        self._data = data
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index: int) -> str:
+        return str(self._data[self._offsets[index]:
+                              self._offsets[index + 1]], 'utf-8')
+
+
+class BinaryParser:
+    """
+    BinaryParser reads and writes DAGs in a compact binary format
+    The file is a header followed by the arrays of a Graph, each 8 byte aligned:
+    child offsets (CSR style), children, leaf values and label ids.
+    Those are followed by the label table, which is an array of
+    offsets into one utf-8 blob holding every label.
+    Arrays are stored in the byte order of the machine that wrote them
+    """
+
+    magic = b'DAGB'
+    version = 2
+    # magic, version, byte order, num nodes, num edges,
+    # num labels, num label bytes
+    header = struct.Struct('<4sBB2xQQQQ')
+
+    @staticmethod
+    def align(offset: int) -> int:
+        """
+        Rounds offset up to the next multiple of 8
+        """
+        return (offset + 7) & ~7
+
+    @staticmethod
+    def layout(num_nodes: int, num_edges: int, num_labels: int,
+               num_label_bytes: int) -> List[int]:
+        """
+        Returns the start offset of every section, followed by the end
+        of the label blob
+        """
+        align = BinaryParser.align
+        child_offsets = BinaryParser.header.size
+        children = align(child_offsets + 8 * (num_nodes + 1))
+        values = align(children + 4 * num_edges)
+        label_ids = align(values + 8 * num_nodes)
+        label_offsets = align(label_ids + 4 * num_nodes)
+        labels = align(label_offsets + 8 * (num_labels + 1))
+        return [child_offsets, children, values, label_ids, label_offsets,
+                labels, labels + num_label_bytes]
+
+    @staticmethod
+    def is_binary(filename: str) -> bool:
+        """
+        Checks whether the file starts with the binary format magic
+        """
+        with open(filename, 'rb') as file:
+            return file.read(len(BinaryParser.magic)) == BinaryParser.magic
+
+    def generate_from_file(self, filename: str) -> GraphNode:
+        """
+        Memory maps a binary DAG file and returns the root node
+        """
+        return self.load(filename).root
+
+    def load(self, filename: str) -> BinaryGraph:
+        """
+        Memory maps a binary DAG file
+        """
+        with open(filename, 'rb') as file:
+            if fstat(file.fileno()).st_size < self.header.size:
+                raise ParserException(
+                    '{} is not a binary DAG file'.format(filename))
+            file_map = mmap(file.fileno(), 0, access=ACCESS_READ)
+        try:
+            magic, version, byte_order, num_nodes, num_edges, num_labels, \
+                num_label_bytes = self.header.unpack_from(file_map)
+            if magic != self.magic or version != self.version:
+                raise ParserException(
+                    '{} is not a binary DAG file'.format(filename))
+            if byte_order != self._byte_order():
+                raise ParserException(
+                    '{} was written on a machine with a different byte order'.format(filename))
+            if num_nodes == 0:
+                raise ParserException('Root node not found')
+            size = self.layout(num_nodes, num_edges,
+                               num_labels, num_label_bytes)[-1]
+            if len(file_map) < size:
+                raise ParserException('{} is truncated'.format(filename))
+        except ParserException:
+            file_map.close()
+            raise
+        return BinaryGraph(file_map, num_nodes, num_edges,
+                           num_labels, num_label_bytes, filename)
+
+    def convert(self, input_file: str, output_file: str) -> None:
+        """
+        Converts a text DAG file into the binary format
+        """
+        graph = Parser().generate_graph_from_file(input_file)
+        self.write_to_file(graph, output_file)
+
+    def write_to_file(self, root: Union[Node, Graph], filename: str) -> None:
+        """
+        Serialize the DAG to a binary file.
+        Graphs of Nodes are packed into a Graph first
+        """
+        graph = root if isinstance(root, Graph) else Graph.from_node(root)
+        labels = bytearray()
+        label_offsets = array('Q', [0])
+        for label in graph.labels:
+            labels += label.encode('utf-8')
+            label_offsets.append(len(labels))
+        arrays = [array('Q', graph.child_offsets), array('I', graph.child_ids),
+                  array('q', graph.values), array('I', graph.label_ids),
+                  label_offsets]
+        with open(filename, 'wb') as file:
+            file.write(self.header.pack(self.magic, self.version,
+                                        self._byte_order(), len(graph),
+                                        len(arrays[1]), len(graph.labels),
+                                        len(labels)))
+            for data in arrays:
+                data.tofile(file)
+                self._pad(file)
+            file.write(labels)
+
+    def _pad(self, file) -> None:
+        """
+        Pads the file with zeros up to the next 8 byte boundary
+        """
+        position = file.tell()
+        file.write(bytes(self.align(position) - position))
+
+    def _byte_order(self) -> int:
+        """
+        Byte order flag stored in the header
+        """
+        return 0 if sys.byteorder == 'little' else 1
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Converts a DAG file into the binary DAG format'
+    )
+    parser.add_argument('input', help='DAG file to convert')
+    parser.add_argument('output', help='File to write the binary DAG to')
+    args = parser.parse_args()
+    BinaryParser().convert(args.input, args.output)
@@ -1,6 +1,12 @@
-from solver import Solver, SolveType, SolveStep
+from solver import Solver, SolveType, SolveStep, Engine
 from parser import Parser
-from queue import Queue
+from binary import BinaryParser
+from transposition import TranspositionTable
+from ordering import MoveOrder
+from tictactoe import TicTacToeSpace, TileState
+from stats import SearchStats, phase
+from typing import Tuple
+import sys
 
 
 class CMD:
@@ -9,46 +15,109 @@ class CMD:
     """
 
     def __init__(self, input_file: str, solver_type: str,
-                 prune: bool, verbose: bool) -> None:
+                 prune: bool, verbose: bool,
+                 transposition: bool = False,
+                 board: Tuple[int, int, int] = None,
+                 workers: int = 1, ordering: bool = False,
+                 deepen: Tuple[int, float, int] = None,
+                 engine: str = 'ab', stats: str = None) -> None:
         self._solver_type = solver_type
         self._prune = prune
         self._verbose = verbose
         self._input_file = input_file
-        self._parser = Parser()
-        self._solver = Solver()
+        self._board = board
+        self._deepen = deepen
+        self._stats_format = stats
+        self._stats = SearchStats() if stats is not None else None
+        self._parser = Parser(self._stats)
+        self._table = TranspositionTable() if transposition else None
+        self._solver = Solver(self._table, workers,
+                              MoveOrder() if ordering else None, self._stats)
         if solver_type == 'min':
             self._solver_type = SolveType.MIN
         elif solver_type == 'max':
             self._solver_type = SolveType.MAX
         else:
             raise Exception('invalid type')
+        if engine == 'ab':
+            self._engine = Engine.ALPHA_BETA
+        elif engine == 'pvs':
+            self._engine = Engine.PVS
+        elif engine == 'mtdf':
+            self._engine = Engine.MTDF
+        elif engine == 'bottomup':
+            self._engine = Engine.BOTTOM_UP
+        else:
+            raise Exception('invalid engine')
 
     def execute(self):
         """
         Execute minimax search on graph
+        If a board size was given, tic tac toe is searched directly
+        instead of reading a graph from a file.
+        deepen is the (nodes, seconds, max depth) budget for iterative
+        deepening, any of which can be None
+        With stats, where the time went and what the search did are
+        printed to stderr at the end, as text or json
         """
-        root = self._parser.generate_from_file(self._input_file)
-        steps = self._solver.solve(
-            root, self._solver_type, self._prune)
-        self._print(steps, self._verbose)
+        space = None
+        if self._board is not None:
+            space = TicTacToeSpace(TileState.X, *self._board)
+            root = space.root
+        elif BinaryParser.is_binary(self._input_file):
+            with phase(self._stats, 'parse'):
+                root = BinaryParser().generate_from_file(self._input_file)
+        else:
+            root = self._parser.generate_from_file(self._input_file)
+        # Verbose runs print every step as it is made, others only
+        # print the step the root picks its child in
+        on_step = self._print_step if self._verbose else None
+        with phase(self._stats, 'solve'):
+            if self._deepen is not None:
+                decision = self._solver.deepen(
+                    root, self._solver_type, space, *self._deepen, on_step)
+            else:
+                decision = self._solver.solve(
+                    root, self._solver_type, self._prune, space, self._engine,
+                    on_step)
+        if not self._verbose:
+            self._print_step(decision)
+        with phase(self._stats, 'print'):
+            if self._deepen is not None and not self._solver.complete:
+                print('stopped after searching {} plies deep ({} nodes), '
+                      'this is the best answer found so far'.format(
+                          self._solver.depth, self._solver.nodes))
+            self._print_table()
+        self._print_stats()
 
-    def _print(self, steps: 'Queue[SolveStep]', verbose: bool) -> None:
+    def _print_table(self) -> None:
         """
-        Print the entire output from traversal
+        Print how much the transposition table saved, if there is one
         """
-        if verbose:
-            while steps.empty() == False:
-                self._print_step(steps.get())
-        else:
-            last_step = None
-            while steps.empty() == False:
-                last_step = steps.get()
-            self._print_step(last_step)
+        if self._table is not None:
+            print('transposition table: {} hits, {} misses'.format(
+                self._table.hits, self._table.misses))
+
+    def _print_stats(self) -> None:
+        """
+        Print the stats, if they were asked for
+        """
+        if self._stats_format == 'json':
+            print(self._stats.to_json(), file=sys.stderr)
+        elif self._stats_format is not None:
+            print(self._stats.to_text(), file=sys.stderr)
 
     def _print_step(self, step: SolveStep) -> None:
         """
         Print a single traversal step
         """
+        with phase(self._stats, 'print'):
+            self._print_single_step(step)
+
+    def _print_single_step(self, step: SolveStep) -> None:
+        """
+        Body of _print_step
+        """
         chooses_str = 'chooses {} for {}'.format(
             step.selected.label, step.value)
         if step.select_type == SolveType.MIN:
@@ -1,58 +1,101 @@
-from tictactoe import TicTacToeBoard
+from tictactoe import TicTacToeBoard, TicTacToeException
 from tictactoe import TileState
 from node import Node
+from graph import Graph, GraphBuilder
 from parser import Parser
+from stats import SearchStats, phase
+from string import ascii_lowercase
+from typing import Dict
 import argparse
 
 
 class Generator:
-    _min_level = 6
-    _row_str = ['1', '2', '3']
-    _column_str = ['a', 'b', 'c']
+    """
+    Generator builds the game graph for m,n,k games: tic tac toe on a
+    width x height board, where win_length in a row wins.
+    The default is regular tic tac toe.
+    Symmetric positions share a node in the graph
+    """
 
-    def __init__(self, starting_player: TileState) -> None:
+    def __init__(self, starting_player: TileState, width: int = 3,
+                 height: int = 3, win_length: int = 3,
+                 stats: SearchStats = None) -> None:
+        if width > len(ascii_lowercase):
+            raise TicTacToeException(
+                'boards wider than {} columns are not supported'.format(
+                    len(ascii_lowercase)))
         self._starting_player = starting_player
+        self._width = width
+        self._height = height
+        self._win_length = win_length
+        # Nobody can have win_length in a row before the first player
+        # has made win_length moves
+        self._min_level = 2 * win_length - 1
         self._cache = {}
+        self._positions = {}
+        self._stats = stats
 
     def generate(self) -> Node:
         """
         Generate the graph for tic tac toe
         """
-        board = TicTacToeBoard()
-        root = Node('')
-        self._level(root, board, self._starting_player, 0)
-        root.label = 'root'
-        return root
+        return self.generate_graph().to_node()
 
-    def _level(self, parent: Node, board: TicTacToeBoard,
-               player: TileState, level: int) -> None:
+    def generate_graph(self) -> Graph:
+        """
+        Generate the graph for tic tac toe, packed into a Graph
+        """
+        board = TicTacToeBoard(self._width, self._height, self._win_length)
+        builder = GraphBuilder()
+        root = builder.add_node('')
+        self._cache = {board.canonical_key(): root}
+        with phase(self._stats, 'generate'):
+            self._level(builder, root, '', board, self._starting_player, 0)
+            builder.set_label(root, 'root')
+            graph = builder.build(root)
+        ids = builder.ids
+        self._positions = {key: ids[node] for key, node in self._cache.items()}
+        return graph
+
+    @property
+    def positions(self) -> Dict[int, int]:
+        """
+        The node id of every position in the last generated graph,
+        by canonical board key
+        """
+        return self._positions
+
+    def _level(self, builder: GraphBuilder, parent: int, parent_label: str,
+               board: TicTacToeBoard, player: TileState, level: int) -> None:
         """
         Recursive step for graph generation
         """
         other_player = self._switch_player(player)
         if level >= self._min_level:
             if board.check_win(other_player):
-                parent.value = self._value(other_player)
+                builder.set_value(parent, self._value(other_player))
                 return
         moves = board.empty_tiles()
         if len(moves) == 0:
-            parent.value = self._value(TileState.EMPTY)
+            builder.set_value(parent, self._value(TileState.EMPTY))
             return
-        parent_label = parent.label
         children = []
         for move in moves:
             board.set(move[0], move[1], player)
-            child_node = self._check_cache(board)
+            # Every equivalent board state has the same canonical key
+            key = board.canonical_key()
+            child_node = self._cache.get(key)
             if child_node is not None:
                 children.append(child_node)
             else:
                 child_label = parent_label + self._notation(move[0], move[1])
-                child_node = Node(child_label)
+                child_node = builder.add_node(child_label)
                 children.append(child_node)
-                self._cache_board(board, child_node)
-                self._level(child_node, board, other_player, level + 1)
+                self._cache[key] = child_node
+                self._level(builder, child_node, child_label,
+                            board, other_player, level + 1)
             board.set(move[0], move[1], TileState.EMPTY)
-        parent.children = [x for x in {x.label: x for x in children}.values()]
+        builder.set_children(parent, list(dict.fromkeys(children)))
 
     def _switch_player(self, player: TileState) -> TileState:
         """
@@ -68,7 +111,7 @@ class Generator:
         """
         Utility function to generate node label
         """
-        return self._column_str[column] + self._row_str[row]
+        return ascii_lowercase[column] + str(row + 1)
 
     def _value(self, player: TileState) -> int:
         """
@@ -83,36 +126,31 @@ class Generator:
             return 0
         raise Exception('bruuhh')
 
-    def _check_cache(self, board: TicTacToeBoard) -> Node:
-        """
-        Check if we've already traversed the node
-        """
-        hash = board.hash()
-        if hash in self._cache:
-            return self._cache[hash]
-        return None
-
-    def _cache_board(self, board: TicTacToeBoard, node: Node) -> None:
-        """
-        Cache board, and equivalent board states
-        """
-        self._cache[board.hash()] = node
-        self._cache[board.x_flip().hash()] = node
-        self._cache[board.y_flip().hash()] = node
-        self._cache[board.rotate_ccw_90().hash()] = node
-        self._cache[board.rotate_ccw_180().hash()] = node
-        self._cache[board.rotate_ccw_270().hash()] = node
-        self._cache[board.rotate_cw_90().hash()] = node
-        self._cache[board.rotate_cw_180().hash()] = node
-        self._cache[board.rotate_cw_270().hash()] = node
-
-
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(
         description='Generates a tic tac toe DAG, with symmetries reduced'
     )
     parser.add_argument('filename', help='File to write DAG to')
+    parser.add_argument(
+        '-W',
+        '--width',
+        help='Number of columns on the board. Default is 3',
+        type=int,
+        default=3)
+    parser.add_argument(
+        '-H',
+        '--height',
+        help='Number of rows on the board. Default is 3',
+        type=int,
+        default=3)
+    parser.add_argument(
+        '-k',
+        '--win-length',
+        help='Number in a row needed to win. Default is 3',
+        type=int,
+        default=3)
     args = parser.parse_args()
-    root = Generator(TileState.X).generate()
+    graph = Generator(TileState.X, args.width, args.height,
+                      args.win_length).generate_graph()
     writer = Parser()
-    writer.write_to_file(root, args.filename)
+    writer.write_to_file(graph, args.filename)
@@ -0,0 +1,250 @@
+from node import Node
+from space import SearchSpace, NodeSpace
+from typing import Dict, Hashable, List, Sequence
+from array import array
+
+
+class Graph(SearchSpace):
+    """
+    Graph keeps a whole DAG in flat arrays instead of one Node per node.
+    Nodes are integer ids, and the root is always node 0.
+    The children of node i are children[child_offsets[i]:child_offsets[i + 1]],
+    so nodes without children are leaves, and their value is values[i].
+    Labels are interned: node i is labelled labels[label_ids[i]]
+    The arrays can be anything indexable, such as array.array or a
+    memoryview over a file
+    """
+
+    def __init__(self, child_offsets: Sequence[int], children: Sequence[int],
+                 values: Sequence[int], label_ids: Sequence[int],
+                 labels: Sequence[str]) -> None:
+        self._child_offsets = child_offsets
+        self._children = children
+        self._values = values
+        self._label_ids = label_ids
+        self._labels = labels
+
+    @staticmethod
+    def from_node(root: Node) -> 'Graph':
+        """
+        Copies a graph of Nodes into a Graph
+        """
+        return Graph.from_space(NodeSpace(), root)
+
+    @staticmethod
+    def from_space(space: SearchSpace, start: Hashable) -> 'Graph':
+        """
+        Copies every state reachable from start into a Graph, with start
+        as the root. States with the same SearchSpace.key share a node
+        """
+        builder = GraphBuilder()
+        key = space.key
+        ids: Dict[Hashable, int] = {}
+        order = [start]
+        ids[key(start)] = builder.add_node(
+            space.node(start).label,
+            space.value(start) if space.is_leaf(start) else None)
+        for state in order:
+            if space.is_leaf(state):
+                continue
+            children = []
+            for child in space.children(state):
+                child_key = key(child)
+                child_id = ids.get(child_key)
+                if child_id is None:
+                    child_id = builder.add_node(
+                        space.node(child).label,
+                        space.value(child) if space.is_leaf(child) else None)
+                    ids[child_key] = child_id
+                    order.append(child)
+                children.append(child_id)
+            builder.set_children(ids[key(state)], children)
+        return builder.build(0)
+
+    def to_node(self) -> Node:
+        """
+        Builds a graph of Nodes with the same shape, and returns the root
+        """
+        nodes = [Node(self.label(x), self.value(x) if self.is_leaf(x) else None)
+                 for x in range(len(self))]
+        for x, node in enumerate(nodes):
+            if not self.is_leaf(x):
+                node.children = [nodes[y] for y in self.children(x)]
+        return nodes[0]
+
+    @property
+    def root(self) -> 'GraphNode':
+        return GraphNode(self, 0)
+
+    @property
+    def child_offsets(self) -> Sequence[int]:
+        return self._child_offsets
+
+    @property
+    def child_ids(self) -> Sequence[int]:
+        return self._children
+
+    @property
+    def values(self) -> Sequence[int]:
+        return self._values
+
+    @property
+    def label_ids(self) -> Sequence[int]:
+        return self._label_ids
+
+    @property
+    def labels(self) -> Sequence[str]:
+        return self._labels
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def label(self, state: int) -> str:
+        return self._labels[self._label_ids[state]]
+
+    def value(self, state: int) -> int:
+        return self._values[state]
+
+    def is_leaf(self, state: int) -> bool:
+        return self._child_offsets[state] == self._child_offsets[state + 1]
+
+    def children(self, state: int) -> List[int]:
+        return self._children[self._child_offsets[state]:
+                              self._child_offsets[state + 1]].tolist()
+
+    def node(self, state: int) -> 'GraphNode':
+        return GraphNode(self, state)
+
+
+class GraphNode:
+    """
+    GraphNode is a read only view of one node in a Graph, with the Node API.
+    Two GraphNodes are equal if they point at the same node, which
+    lets them be used as transposition table keys
+    """
+
+    __slots__ = ('_graph', '_index')
+
+    def __init__(self, graph: Graph, index: int) -> None:
+        self._graph = graph
+        self._index = index
+
+    @property
+    def graph(self) -> Graph:
+        return self._graph
+
+    @property
+    def index(self) -> int:
+        return self._index
+
+    @property
+    def label(self) -> str:
+        return self._graph.label(self._index)
+
+    @property
+    def value(self) -> int:
+        if self.is_leaf:
+            return self._graph.value(self._index)
+        return None
+
+    @property
+    def is_leaf(self) -> bool:
+        return self._graph.is_leaf(self._index)
+
+    @property
+    def children(self) -> List['GraphNode']:
+        if self.is_leaf:
+            return None
+        graph = self._graph
+        return [GraphNode(graph, x) for x in graph.children(self._index)]
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, GraphNode) and \
+            self._graph is other._graph and self._index == other._index
+
+    def __hash__(self) -> int:
+        return self._index
+
+
+class GraphBuilder:
+    """
+    GraphBuilder collects nodes in any order, then packs them into a Graph
+    Children can be set after the nodes they point at have been added
+    """
+
+    def __init__(self) -> None:
+        self._children: List[List[int]] = []
+        self._values = array('q')
+        self._label_ids = array('I')
+        self._labels: List[str] = []
+        self._label_table: Dict[str, int] = {}
+        self._ids: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def add_node(self, label: str, value: int = None) -> int:
+        """
+        Adds a node and returns its id. Nodes start out as leaves
+        """
+        self._label_ids.append(self._intern(label))
+        self._values.append(0 if value is None else value)
+        self._children.append(None)
+        return len(self._values) - 1
+
+    def set_children(self, node: int, children: List[int]) -> None:
+        self._children[node] = children
+
+    def set_value(self, node: int, value: int) -> None:
+        self._values[node] = value
+
+    def set_label(self, node: int, label: str) -> None:
+        self._label_ids[node] = self._intern(label)
+
+    def children(self, node: int) -> List[int]:
+        return self._children[node]
+
+    @property
+    def ids(self) -> Dict[int, int]:
+        """
+        The id every node got in the last Graph built, by the id add_node
+        returned. Nodes that weren't reachable from the root are missing
+        """
+        return self._ids
+
+    def _intern(self, label: str) -> int:
+        """
+        Returns the id of the label, adding it to the table if it's new
+        """
+        label_id = self._label_table.get(label)
+        if label_id is None:
+            label_id = len(self._labels)
+            self._label_table[label] = label_id
+            self._labels.append(label)
+        return label_id
+
+    def build(self, root: int) -> Graph:
+        """
+        Packs every node reachable from root into a Graph.
+        Nodes are renumbered in the order a BFS from the root finds them,
+        so the root ends up as node 0
+        """
+        ids = {root: 0}
+        self._ids = ids
+        order = [root]
+        child_offsets = array('Q', [0])
+        children = array('I')
+        for node in order:
+            node_children = self._children[node]
+            if node_children is not None:
+                for child in node_children:
+                    child_id = ids.get(child)
+                    if child_id is None:
+                        child_id = len(order)
+                        ids[child] = child_id
+                        order.append(child)
+                    children.append(child_id)
+            child_offsets.append(len(children))
+        values = array('q', [self._values[x] for x in order])
+        label_ids = array('I', [self._label_ids[x] for x in order])
+        return Graph(child_offsets, children, values, label_ids, self._labels)
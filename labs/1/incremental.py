@@ -0,0 +1,250 @@
+from node import Node, NodeException
+from graph import GraphNode
+from space import SearchSpace, NodeSpace
+from solver import SolveStep, SolveType
+from parser import Parser
+from heapq import heappush, heappop
+from typing import Dict, Hashable, List, Tuple
+import argparse
+
+
+class IncrementalSolver:
+    """
+    IncrementalSolver solves a DAG with minimax once, then keeps it solved
+    while leaf values change, without searching the whole DAG again.
+    Every node keeps its parents and its cached value and choice, for
+    each of max and min that it is reached as. After leaf values change,
+    only the ancestors of those leaves are worked out again, children
+    before parents, and a chain stops at the first node whose value
+    stays the same.
+    The DAG itself isn't changed, the new leaf values are kept here.
+    Ties go to the first child, same as Solver._minimax
+    """
+
+    def __init__(self, start: Node, start_type: SolveType,
+                 space: SearchSpace = None) -> None:
+        if space is None:
+            if isinstance(start, GraphNode):
+                space, start = start.graph, start.index
+            else:
+                space = NodeSpace()
+        self._space = space
+        self._start_type = start_type
+        # Node ids, in the order a BFS from start finds them
+        self._ids: Dict[Hashable, int] = {}
+        self._states: List[Hashable] = []
+        self._children: List[List[int]] = []
+        self._parents: List[List[int]] = []
+        self._values: List[int] = []
+        self._add(start)
+        for node, state in enumerate(self._states):
+            if space.is_leaf(state):
+                self._values[node] = space.value(state)
+                continue
+            children = [self._add(child) for child in space.children(state)]
+            self._children[node] = children
+            for child in children:
+                self._parents[child].append(node)
+        # [value, chosen child, rank] for every (node, type) reached from
+        # start. Ranks are post-order, so children come before parents
+        self._solved: Dict[Tuple[int, SolveType], list] = {}
+        self._solve()
+
+    @property
+    def decision(self) -> SolveStep:
+        """
+        The step where start picks its child, or None if start is a leaf
+        """
+        entry = self._solved.get((0, self._start_type))
+        if entry is None:
+            return None
+        return self._step(0, self._start_type, entry)
+
+    def update(self, values: Dict[Node, int]) -> Tuple[SolveStep, List[SolveStep]]:
+        """
+        Changes the values of some leaves and re-solves what depends on them.
+        Keys are nodes like the one the solver was made with, or states
+        if it was given a space.
+        Returns the new decision for start, and a step for every
+        (node, type) whose value or choice changed, children first
+        """
+        queue = []
+        queued = set()
+        for leaf, value in values.items():
+            node = self._node_id(leaf)
+            if self._children[node] is not None:
+                raise NodeException('{} is not a leaf'.format(
+                    self._space.node(self._states[node]).label))
+            if self._values[node] == value:
+                continue
+            self._values[node] = value
+            for parent in self._parents[node]:
+                for select_type in (SolveType.MAX, SolveType.MIN):
+                    self._push(queue, queued, parent, select_type)
+        changed = []
+        while len(queue) > 0:
+            _, node, select_type = heappop(queue)
+            entry = self._solved[(node, select_type)]
+            value, chosen = self._best(node, select_type)
+            if value == entry[0] and chosen == entry[1]:
+                continue
+            moved = value != entry[0]
+            entry[0] = value
+            entry[1] = chosen
+            changed.append(self._step(node, select_type, entry))
+            # Parents only look at values, so a new choice with the
+            # same value stops here
+            if moved:
+                parent_type = self._switch_type(select_type)
+                for parent in self._parents[node]:
+                    self._push(queue, queued, parent, parent_type)
+        return self.decision, changed
+
+    def _add(self, state: Hashable) -> int:
+        """
+        Returns the id of a state, giving it one if it's new.
+        States with the same SearchSpace.key share an id
+        """
+        key = self._space.key(state)
+        node = self._ids.get(key)
+        if node is None:
+            node = len(self._states)
+            self._ids[key] = node
+            self._states.append(state)
+            self._children.append(None)
+            self._parents.append([])
+            self._values.append(None)
+        return node
+
+    def _node_id(self, leaf: Node) -> int:
+        """
+        Turns a node passed to update into its id
+        """
+        if isinstance(leaf, GraphNode) and leaf.graph is self._space:
+            leaf = leaf.index
+        node = self._ids.get(self._space.key(leaf))
+        if node is None:
+            raise NodeException('{} can not be reached from the start'.format(
+                self._space.node(leaf).label))
+        return node
+
+    def _solve(self) -> None:
+        """
+        Solves every (node, type) reached from start, in post-order
+        Frames are [node, type, next child index]
+        """
+        if self._children[0] is None:
+            return
+        solved = self._solved
+        rank = 0
+        stack = [[0, self._start_type, 0]]
+        while len(stack) > 0:
+            frame = stack[-1]
+            children = self._children[frame[0]]
+            index = frame[2]
+            if index < len(children):
+                frame[2] = index + 1
+                child = children[index]
+                child_type = self._switch_type(frame[1])
+                if self._children[child] is not None and \
+                        (child, child_type) not in solved:
+                    stack.append([child, child_type, 0])
+            else:
+                stack.pop()
+                value, chosen = self._best(frame[0], frame[1])
+                solved[(frame[0], frame[1])] = [value, chosen, rank]
+                rank += 1
+
+    def _best(self, node: int, select_type: SolveType) -> Tuple[int, int]:
+        """
+        Picks the best child of a non leaf node from the cached values
+        """
+        child_type = self._switch_type(select_type)
+        solved = self._solved
+        values = self._values
+        best = None
+        chosen = None
+        for child in self._children[node]:
+            value = values[child]
+            if value is None:
+                value = solved[(child, child_type)][0]
+            if best is None or (value > best if select_type == SolveType.MAX
+                                else value < best):
+                best = value
+                chosen = child
+        return best, chosen
+
+    def _push(self, queue: list, queued: set, node: int,
+              select_type: SolveType) -> None:
+        """
+        Queues a (node, type) to be worked out again, if it was reached
+        as that type and isn't queued yet
+        """
+        entry = self._solved.get((node, select_type))
+        if entry is not None and (node, select_type) not in queued:
+            queued.add((node, select_type))
+            heappush(queue, (entry[2], node, select_type))
+
+    def _step(self, node: int, select_type: SolveType, entry: list) -> SolveStep:
+        node_of = self._space.node
+        states = self._states
+        return SolveStep(node_of(states[node]), node_of(states[entry[1]]),
+                         select_type, entry[0])
+
+    def _switch_type(self, select_type: SolveType) -> SolveType:
+        if select_type == SolveType.MAX:
+            return SolveType.MIN
+        return SolveType.MAX
+
+
+def _print_step(step: SolveStep) -> None:
+    """
+    Print a single step, the same way minimax.py does
+    """
+    name = 'min' if step.select_type == SolveType.MIN else 'max'
+    print('{}({}) chooses {} for {}'.format(
+        name, step.parent.label, step.selected.label, step.value))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Solves a DAG file, then changes some leaf values and '
+                    'prints what changed')
+    parser.add_argument(
+        'type',
+        metavar='[min/max]',
+        help='Sets root node as min or max')
+    parser.add_argument('filename', help='DAG file to solve')
+    parser.add_argument(
+        'updates',
+        nargs='+',
+        help='New leaf values, like a1=3')
+    args = parser.parse_args()
+    root = Parser().generate_from_file(args.filename)
+    labels = {}
+    pending = [root]
+    while len(pending) > 0:
+        node = pending.pop()
+        if node.label not in labels:
+            labels[node.label] = node
+            if not node.is_leaf:
+                pending.extend(node.children)
+    updates = {}
+    for update in args.updates:
+        label, equals, value = update.partition('=')
+        if equals == '':
+            parser.error('bad update {}'.format(update))
+        try:
+            value = int(value)
+        except ValueError:
+            parser.error('bad update {}'.format(update))
+        if label not in labels:
+            parser.error('no node labelled {}'.format(label))
+        updates[labels[label]] = value
+    solver = IncrementalSolver(
+        root, SolveType.MIN if args.type == 'min' else SolveType.MAX)
+    decision, changed = solver.update(updates)
+    for step in changed:
+        _print_step(step)
+    if decision is not None:
+        _print_step(decision)
@@ -3,12 +3,15 @@ from cmd import CMD
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(
-        description='Runs minimax solver on a DAG file')
+        description='Runs minimax solver on a DAG file, or on tic tac toe')
     parser.add_argument(
         'type',
         metavar='[min/max]',
         help='Sets root node as min or max')
-    parser.add_argument('filename', help='DAG file to solve')
+    parser.add_argument(
+        'filename',
+        nargs='?',
+        help='DAG file to solve. Not needed with --tictactoe')
     parser.add_argument(
         '-v',
         '--verbose',
@@ -21,5 +24,109 @@ if __name__ == '__main__':
         help='Turns on alpha beta pruning. Default is false',
         action='store_true',
         default=False)
-    args = parser.parse_args()
-    CMD(args.filename, args.type, args.alpha_beta, args.verbose).execute()
+    parser.add_argument(
+        '-tt',
+        '--transposition',
+        help='Caches results for nodes shared between parents. Default is false',
+        action='store_true',
+        default=False)
+    parser.add_argument(
+        '-ttt',
+        '--tictactoe',
+        help='Solves tic tac toe directly, without a DAG file. '
+             'Default is false',
+        action='store_true',
+        default=False)
+    parser.add_argument(
+        '-W',
+        '--width',
+        help='Number of columns on the tic tac toe board. Default is 3',
+        type=int,
+        default=3)
+    parser.add_argument(
+        '-H',
+        '--height',
+        help='Number of rows on the tic tac toe board. Default is 3',
+        type=int,
+        default=3)
+    parser.add_argument(
+        '-k',
+        '--win-length',
+        help='Number in a row needed to win tic tac toe. Default is 3',
+        type=int,
+        default=3)
+    parser.add_argument(
+        '-w',
+        '--workers',
+        help='Number of processes to search the children of the root with. '
+             'Default is 1',
+        type=int,
+        default=1)
+    parser.add_argument(
+        '-e',
+        '--engine',
+        help='Pruning search to use: ab for alpha beta, pvs for principal '
+             'variation search or mtdf for MTD(f). '
+             'pvs and mtdf turn on pruning. bottomup solves every node '
+             'without pruning, a level at a time with NumPy. Default is ab',
+        choices=['ab', 'pvs', 'mtdf', 'bottomup'],
+        default='ab')
+    parser.add_argument(
+        '-o',
+        '--ordering',
+        help='Tries the children most likely to cause a cutoff first, '
+             'using killer and history heuristics. Default is false',
+        action='store_true',
+        default=False)
+    parser.add_argument(
+        '-d',
+        '--deepen',
+        help='Uses iterative deepening alpha beta, which can stop early '
+             'with the best answer found so far. Default is false',
+        action='store_true',
+        default=False)
+    parser.add_argument(
+        '--nodes',
+        help='With --deepen, stop after searching this many nodes',
+        type=int,
+        default=None)
+    parser.add_argument(
+        '--seconds',
+        help='With --deepen, stop after this many seconds',
+        type=float,
+        default=None)
+    parser.add_argument(
+        '--max-depth',
+        help='With --deepen, stop after searching this many plies deep',
+        type=int,
+        default=None)
+    parser.add_argument(
+        '--stats',
+        help='Prints how long parsing, the cycle check, solving and '
+             'printing took, and how many nodes, leaves and cutoffs the '
+             'search had, to stderr. Default is false',
+        action='store_true',
+        default=False)
+    parser.add_argument(
+        '--stats-format',
+        help='Format of --stats, text or json. Default is text',
+        choices=['text', 'json'],
+        default='text')
+    # filename is optional, so it has to be parsed after the options for
+    # something like max -ab dag.txt to work
+    args = parser.parse_intermixed_args()
+    board = None
+    if args.tictactoe:
+        board = (args.width, args.height, args.win_length)
+    elif args.filename is None:
+        parser.error('a DAG file is required without --tictactoe')
+    deepen = None
+    if args.deepen:
+        deepen = (args.nodes, args.seconds, args.max_depth)
+    if args.engine == 'bottomup' and args.alpha_beta:
+        parser.error('bottomup does not prune, so it can not be used with -ab')
+    prune = args.alpha_beta or args.engine in ('pvs', 'mtdf')
+    CMD(args.filename, args.type, prune,
+        args.verbose, args.transposition, board, args.workers,
+        args.ordering, deepen, args.engine,
+        args.stats_format if args.stats else None).execute()
@@ -0,0 +1,67 @@
+from space import SearchSpace
+from typing import Dict, Hashable, List
+
+
+class MoveOrder:
+    """
+    MoveOrder decides which children the alpha beta search tries first,
+    so the amount of pruning doesn't depend on how the DAG file is laid out.
+    Children are tried in this order:
+    the best child found the last time the node was searched,
+    then killers, children that caused a cutoff at the same ply,
+    then children by history, which counts how often a child caused a
+    cutoff anywhere (deeper searches count for more).
+    Ties keep the order of the file.
+    A DAG has no moves, so children are remembered by their
+    transposition table key instead
+    """
+
+    def __init__(self, killers_per_ply: int = 2) -> None:
+        self._killers_per_ply = killers_per_ply
+        self._killers: List[List[Hashable]] = []
+        self._history: Dict[Hashable, int] = {}
+        self._best: Dict[Hashable, Hashable] = {}
+
+    def order(self, space: SearchSpace, state: Hashable,
+              children: List[Hashable], ply: int) -> List[Hashable]:
+        """
+        Returns the children of state in the order they should be searched
+        """
+        key = space.key
+        best = self._best.get(key(state))
+        killers = self._killers[ply] if ply < len(self._killers) else ()
+        history = self._history
+
+        def score(child: Hashable) -> tuple:
+            child_key = key(child)
+            return (child_key != best, child_key not in killers,
+                    -history.get(child_key, 0))
+
+        return sorted(children, key=score)
+
+    def cutoff(self, child: Hashable, ply: int, depth: int = 1) -> None:
+        """
+        Records that the child with key 'child' caused a cutoff at ply,
+        with depth plies searched below its parent
+        """
+        while len(self._killers) <= ply:
+            self._killers.append([])
+        killers = self._killers[ply]
+        if child not in killers:
+            killers.insert(0, child)
+            del killers[self._killers_per_ply:]
+        self._history[child] = self._history.get(child, 0) + depth * depth
+
+    def best(self, state: Hashable, child: Hashable) -> None:
+        """
+        Records the best child found for the node with key 'state'
+        """
+        self._best[state] = child
+
+    def clear(self) -> None:
+        """
+        Forgets everything
+        """
+        self._killers.clear()
+        self._history.clear()
+        self._best.clear()
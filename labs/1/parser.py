@@ -1,5 +1,9 @@
 from node import Node
-from typing import Tuple, List, Dict, FrozenSet
+from stats import SearchStats, phase
+from graph import Graph, GraphBuilder
+from space import SearchSpace, NodeSpace
+from typing import Tuple, Dict, List, Hashable, Iterator, Union
+from collections import deque
 from random import shuffle
 from os import linesep
 
@@ -15,108 +19,239 @@ class Parser:
     nodes to DAG files
     """
 
+    _GREY = 1
+    _BLACK = 2
+
+    def __init__(self, stats: SearchStats = None) -> None:
+        self._stats = stats
+
     def generate_from_file(self, filename: str) -> Node:
         """
         generate_from_file takes in a file, parses it and returns the root node.
         """
+        with phase(self._stats, 'parse'):
+            return self._read_nodes(filename)
+
+    def _read_nodes(self, filename: str) -> Node:
+        """
+        Body of generate_from_file
+        """
         all_nodes = {}
         nodes_with_children = {}
         with open(filename, 'r') as file:
             for line in file:
                 if ':' in line:
-                    node, children = self._parse_internal(line)
-                    if node.label in all_nodes:
+                    label, children = self._parse_internal(line)
+                    if label in all_nodes:
                         raise ParserException(
-                            'node {} duplicate'.format(node.label))
-                    all_nodes[node.label] = node
-                    nodes_with_children[node.label] = children
+                            'node {} duplicate'.format(label))
+                    all_nodes[label] = Node(label=label)
+                    nodes_with_children[label] = children
                 else:
-                    node = self._parse_leaf(line)
-                    if node.label in all_nodes:
+                    label, value = self._parse_leaf(line)
+                    if label in all_nodes:
                         raise ParserException(
-                            'node {} duplicate'.format(node.label))
-                    all_nodes[node.label] = node
+                            'node {} duplicate'.format(label))
+                    all_nodes[label] = Node(label=label, value=value)
         return self._construct_graph(all_nodes, nodes_with_children)
 
+    def generate_graph_from_file(self, filename: str) -> Graph:
+        """
+        Same as generate_from_file, but packs the DAG into a Graph
+        instead of building a Node for every node
+        """
+        with phase(self._stats, 'parse'):
+            return self._read_graph(filename)
+
+    def _read_graph(self, filename: str) -> Graph:
+        """
+        Body of generate_graph_from_file
+        """
+        builder = GraphBuilder()
+        ids = {}
+        nodes_with_children = {}
+        with open(filename, 'r') as file:
+            for line in file:
+                if ':' in line:
+                    label, children = self._parse_internal(line)
+                    value = None
+                else:
+                    label, value = self._parse_leaf(line)
+                    children = None
+                if label in ids:
+                    raise ParserException('node {} duplicate'.format(label))
+                node = builder.add_node(label, value)
+                ids[label] = node
+                if children is not None:
+                    nodes_with_children[node] = children
+        try:
+            num_parents = [0] * len(builder)
+            for node, children_labels in nodes_with_children.items():
+                children = [ids[x] for x in children_labels]
+                builder.set_children(node, children)
+                for x in children:
+                    num_parents[x] += 1
+        except KeyError as e:
+            raise ParserException('missing node: {}'.format(e.args[0]))
+        root_set = [x for x, count in enumerate(num_parents) if count == 0]
+        num_roots = len(root_set)
+        if num_roots == 0:
+            raise ParserException('Root node not found')
+        if num_roots > 1:
+            raise ParserException('Multiple root nodes found')
+        graph = builder.build(root_set[0])
+        with phase(self._stats, 'cycle check'):
+            self._check_cycle(graph, 0)
+        return graph
+
     def _construct_graph(
-            self, all_nodes: Dict[str, Node], nodes_with_children: Dict[str, FrozenSet[str]]) -> Node:
+            self, all_nodes: Dict[str, Node], nodes_with_children: Dict[str, List[str]]) -> Node:
         """
         Constructs the graph from the parsed file
+        Parents are counted while the children get linked up,
+        so the root is whichever node is left without any.
         Does cycle detection
         """
         try:
-            nodes_with_parents = set()
-            for label in nodes_with_children.keys():
-                node = all_nodes[label]
-                children_labels = nodes_with_children[label]
-                children_nodes = [all_nodes[x] for x in children_labels]
-                node.children = children_nodes
-                nodes_with_parents = nodes_with_parents | children_labels
-            root_set = set(all_nodes.keys()) - nodes_with_parents
+            num_parents = dict.fromkeys(all_nodes, 0)
+            for label, children_labels in nodes_with_children.items():
+                all_nodes[label].children = [all_nodes[x]
+                                             for x in children_labels]
+                for x in children_labels:
+                    num_parents[x] += 1
+            root_set = [x for x, count in num_parents.items() if count == 0]
             num_roots = len(root_set)
             if num_roots == 0:
                 raise ParserException('Root node not found')
             if num_roots > 1:
                 raise ParserException('Multiple root nodes found')
-            root_node = all_nodes[root_set.pop()]
-            self._check_cycle(root_node, set())
+            root_node = all_nodes[root_set[0]]
+            with phase(self._stats, 'cycle check'):
+                self._check_cycle(NodeSpace(), root_node)
             return root_node
         except KeyError as e:
             raise ParserException('missing node: {}'.format(e.args[0]))
 
-    def _check_cycle(self, start: Node, seen_nodes: FrozenSet[str]) -> None:
+    def _check_cycle(self, space: SearchSpace, start: Hashable) -> None:
         """
-        Check the graph for cycles using a DFS
+        Check the graph for cycles using a three colour DFS
+        Nodes on the current path are grey and finished nodes are black,
+        unvisited nodes just aren't in the map yet.
+        Running into a grey node means there's a cycle. Black nodes are
+        never walked again, so every node and edge is only visited once
+        The DFS keeps an explicit stack of [node, children, next child index]
+        frames so deep graphs don't hit the recursion limit
         """
-        if start.label in seen_nodes:
-            raise ParserException('Cycle detected')
-        if start.is_leaf is not True:
-            for child in start.children:
-                updated_nodes = seen_nodes.union([start.label])
-                self._check_cycle(child, updated_nodes)
+        is_leaf = space.is_leaf
+        if is_leaf(start):
+            return
+        colour = {start: self._GREY}
+        stack = [[start, space.children(start), 0]]
+        while len(stack) != 0:
+            frame = stack[-1]
+            children = frame[1]
+            if frame[2] == len(children):
+                stack.pop()
+                colour[frame[0]] = self._BLACK
+                continue
+            child = children[frame[2]]
+            frame[2] += 1
+            if is_leaf(child):
+                continue
+            child_colour = colour.get(child)
+            if child_colour == self._GREY:
+                raise ParserException('Cycle detected')
+            if child_colour is None:
+                colour[child] = self._GREY
+                stack.append([child, space.children(child), 0])
 
-    def write_to_file(self, root: Node, filename: str,
-                      shuffle_output: bool = False) -> None:
+    def write_to_file(self, root: Union[Node, Graph], filename: str,
+                      shuffle_output: bool = False,
+                      topological: bool = False) -> None:
         """
-        Serialize the tree to a file.
-        For variety, set shuffle_output to true
+        Serialize the DAG to a file.
+        Every node is written once, as soon as it is visited, so shared
+        subtrees aren't written again for every path into them.
+        Set topological to true to write every parent before its children,
+        in the same order every time.
+        For variety, set shuffle_output to true. This has to hold every line
+        in memory to shuffle them
         """
-        data = self._traverse_tree_for_write(root)
-        # For DAGs, multiple paths lead to the safe node
-        # With our blind traversal, we'll have duplicate lines
-        # For leaf nodes
-        # We can either do a smarter traversal...or just this
-        data = [x for x in set(data)]
+        if isinstance(root, Graph):
+            space, start = root, 0
+        else:
+            space, start = NodeSpace(), root
+        if topological:
+            order = self._topological_order(space, start)
+        else:
+            order = self._visit_order(space, start)
+        lines = (self._format_node(space, x) for x in order)
         if shuffle_output:
-            shuffle(data)
-        to_write = linesep.join(data)
+            lines = list(lines)
+            shuffle(lines)
         with open(filename, 'w') as file:
-            file.write(to_write)
+            separator = ''
+            for line in lines:
+                file.write(separator)
+                file.write(line)
+                separator = linesep
 
-    def _traverse_tree_for_write(self, start: Node) -> List[str]:
+    def _visit_order(self, space: SearchSpace,
+                     start: Hashable) -> Iterator[Hashable]:
         """
-        Recursively traverses the tree, generate a list of strings
-        representing the nodes traversed
+        Yields every node reachable from start exactly once, depth first
         """
-        return_val = []
-        if start is None:
-            return return_val
-        if start.is_leaf:
-            output_str = '{}={}'.format(start.label, start.value)
-            return_val.append(output_str)
-        else:
-            children = '[{}]'.format(
-                ', '.join([x.label for x in start.children]))
-            output_str = '{}: {}'.format(start.label, children)
-            return_val.append(output_str)
-            for x in start.children:
-                return_val.extend(self._traverse_tree_for_write(x))
+        visited = {start}
+        stack = [start]
+        while stack:
+            node = stack.pop()
+            yield node
+            if space.is_leaf(node):
+                continue
+            for child in reversed(space.children(node)):
+                if child not in visited:
+                    visited.add(child)
+                    stack.append(child)
+
+    def _topological_order(self, space: SearchSpace,
+                           start: Hashable) -> Iterator[Hashable]:
+        """
+        Yields every node reachable from start exactly once, with every
+        node after all of its parents (Kahn's algorithm).
+        Ties are broken by the order nodes were found in, so the order
+        is the same every time
+        """
+        num_parents = {start: 0}
+        for node in self._visit_order(space, start):
+            if space.is_leaf(node):
+                continue
+            for child in space.children(node):
+                num_parents[child] = num_parents.get(child, 0) + 1
+        ready = deque([start])
+        while ready:
+            node = ready.popleft()
+            yield node
+            if space.is_leaf(node):
+                continue
+            for child in space.children(node):
+                num_parents[child] -= 1
+                if num_parents[child] == 0:
+                    ready.append(child)
 
-        return return_val
+    def _format_node(self, space: SearchSpace, state: Hashable) -> str:
+        """
+        Returns the line for a node in a DAG file
+        """
+        node = space.node(state)
+        if space.is_leaf(state):
+            return '{}={}'.format(node.label, space.value(state))
+        children = '[{}]'.format(
+            ', '.join([space.node(x).label for x in space.children(state)]))
+        return '{}: {}'.format(node.label, children)
 
-    def _parse_leaf(self, line: str) -> Node:
+    def _parse_leaf(self, line: str) -> Tuple[str, int]:
         """
-        Parse a leaf node. This will return a node with its label
+        Parse a leaf node. This will return its label and value
         """
         split_str = line.split('=')
         if len(split_str) != 2:
@@ -124,14 +259,14 @@ class Parser:
                 'line {} is invalid for a leaf node'.format(line))
         try:
             value = int(split_str[1])
-            return Node(label=split_str[0].strip(), value=value)
+            return [split_str[0].strip(), value]
         except ValueError as e:
             raise ParserException from e
 
-    def _parse_internal(self, line: str) -> Tuple[Node, FrozenSet[str]]:
+    def _parse_internal(self, line: str) -> Tuple[str, List[str]]:
         """
-        Parse an internal node. This returns a node, with a list of the names
-        of its children
+        Parse an internal node. This returns its label, with a list of the names
+        of its children, in the order they are in the file
         """
         split_str = line.split(':')
         if len(split_str) != 2:
@@ -143,8 +278,7 @@ class Parser:
             raise ParserException(
                 'children string {} is improperly formatted'.format(children_str))
         children = [x.strip() for x in children_str[1:-1].split(',')]
-        children_set = set(children)
-        if len(children) != len(children_set):
+        if len(children) != len(set(children)):
             raise ParserException(
                 '{} has duplicate children'.format(children_str))
-        return Node(label=split_str[0].strip()), children_set
+        return [split_str[0].strip(), children]
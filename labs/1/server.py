@@ -0,0 +1,257 @@
+from parser import Parser, ParserException
+from binary import BinaryParser
+from graph import Graph
+from solver import Solver, SolveType
+from transposition import TranspositionTable, Bound
+from tablebase import Tablebase, play
+from string import ascii_lowercase
+from typing import Dict, List, Tuple
+import argparse
+import asyncio
+import os
+import stat
+
+
+class QueryException(Exception):
+    def __init__(self, *args: object) -> None:
+        super().__init__(*args)
+
+
+class QueryServer:
+    """
+    QueryServer loads a DAG or a tablebase once, then answers best move
+    and value queries over a unix socket until it is stopped.
+    The protocol is one line per request and one line per answer, in order:
+    for a DAG, 'best max n3' answers 'ok n3 n7 5', the node, the child it
+    chooses (- for a leaf) and its value, and 'value min n3' answers
+    'ok n3 5'. For a tablebase, positions are the moves played so far,
+    'best b2a1' answers 'ok b1 0' (- once the game is over),
+    and 'value b2a1' answers 'ok 0'. Bad requests answer 'error ...'.
+    Requests from every connection go on one queue, and everything waiting
+    on it is answered as one batch, off the event loop. A batch only solves
+    each distinct node once, and every node solved goes into a transposition
+    table that lives as long as the server, so later requests for anything
+    below an earlier one are table lookups
+    """
+
+    def __init__(self, filename: str, batch_size: int = 256) -> None:
+        self._batch_size = batch_size
+        self._graph: Graph = None
+        self._tablebase: Tablebase = None
+        with open(filename, 'rb') as file:
+            magic = file.read(len(Tablebase.magic))
+        if magic == Tablebase.magic:
+            self._tablebase = Tablebase(filename)
+        elif magic == BinaryParser.magic:
+            self._graph = BinaryParser().load(filename)
+        else:
+            self._graph = Parser().generate_graph_from_file(filename)
+        self._ids: Dict[str, int] = {}
+        if self._graph is not None:
+            graph = self._graph
+            self._ids = {graph.label(x): x for x in range(len(graph))}
+        self._table = TranspositionTable()
+        self._solver = Solver(self._table)
+        self._queue: asyncio.Queue = None
+
+    @property
+    def table(self) -> TranspositionTable:
+        return self._table
+
+    async def serve(self, path: str) -> None:
+        """
+        Serves requests on a unix socket at path until cancelled
+        """
+        self._queue = asyncio.Queue()
+        self._remove_socket(path)
+        server = await asyncio.start_unix_server(self._handle, path)
+        batcher = asyncio.ensure_future(self._batches())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher.cancel()
+            self._remove_socket(path)
+
+    def answer(self, requests: List[str]) -> List[str]:
+        """
+        Answers a batch of requests, in order
+        Identical requests are only answered once, and a request that
+        fails for any reason answers 'error ...' without affecting the rest
+        """
+        answers: Dict[str, str] = {}
+        for request in requests:
+            if request not in answers:
+                try:
+                    answers[request] = self._answer(request.split())
+                except Exception as e:
+                    answers[request] = 'error {}'.format(e)
+        return [answers[request] for request in requests]
+
+    async def _handle(self, reader: asyncio.StreamReader,
+                      writer: asyncio.StreamWriter) -> None:
+        """
+        Reads the requests of one connection onto the queue, and writes
+        the answers back in the same order
+        """
+        loop = asyncio.get_event_loop()
+        pending = asyncio.Queue()
+
+        async def write() -> None:
+            while True:
+                answer = await (await pending.get())
+                if answer is None:
+                    break
+                writer.write(answer.encode('utf-8') + b'\n')
+                await writer.drain()
+
+        writer_task = asyncio.ensure_future(write())
+        try:
+            while True:
+                line = await reader.readline()
+                if len(line) == 0:
+                    break
+                request = line.decode('utf-8').strip()
+                if request == '':
+                    continue
+                future = loop.create_future()
+                await self._queue.put((request, future))
+                await pending.put(future)
+        finally:
+            done = loop.create_future()
+            done.set_result(None)
+            await pending.put(done)
+            await writer_task
+            writer.close()
+
+    async def _batches(self) -> None:
+        """
+        Takes everything waiting on the queue, up to batch_size requests,
+        and answers it on a thread so the loop keeps accepting requests
+        """
+        loop = asyncio.get_event_loop()
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self._batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                answers = await loop.run_in_executor(
+                    None, self.answer, [request for request, _ in batch])
+            except Exception as e:
+                # Keep serving, whatever went wrong with this batch
+                answers = ['error {}'.format(e)] * len(batch)
+            for (_, future), answer in zip(batch, answers):
+                future.set_result(answer)
+
+    def _answer(self, words: List[str]) -> str:
+        """
+        Answers one request, already split into words
+        """
+        if len(words) == 0 or words[0] not in ('best', 'value'):
+            raise QueryException('requests start with best or value')
+        if self._tablebase is not None:
+            if len(words) > 2:
+                raise QueryException('expected {} [moves]'.format(words[0]))
+            return self._answer_tablebase(words[0],
+                                          words[1] if len(words) > 1 else '')
+        if len(words) != 3 or words[1] not in ('max', 'min'):
+            raise QueryException(
+                'expected {} max|min label'.format(words[0]))
+        label = words[2]
+        value, chosen = self._solve(
+            label, SolveType.MAX if words[1] == 'max' else SolveType.MIN)
+        if words[0] == 'value':
+            return 'ok {} {}'.format(label, value)
+        return 'ok {} {} {}'.format(
+            label, '-' if chosen is None else self._graph.label(chosen), value)
+
+    def _solve(self, label: str, select_type: SolveType) -> Tuple[int, int]:
+        """
+        Returns the value of a node and the child it chooses, solving it
+        first unless the table already has it
+        """
+        node = self._ids.get(label)
+        if node is None:
+            raise QueryException('no node labelled {}'.format(label))
+        graph = self._graph
+        if graph.is_leaf(node):
+            return graph.value(node), None
+        entry = self._table.probe(node, select_type)
+        if entry is None or entry.bound != Bound.EXACT:
+            self._solver.solve(node, select_type, False, graph)
+            entry = self._table.probe(node, select_type)
+        return entry.value, entry.best
+
+    def _answer_tablebase(self, command: str, moves: str) -> str:
+        """
+        Answers a request about the position after moves
+        """
+        table = self._tablebase
+        board = play(moves, table.starting_player, table.width,
+                     table.height, table.win_length)
+        value, move = table.lookup(board)
+        if command == 'value':
+            return 'ok {}'.format(value)
+        if move is None:
+            return 'ok - {}'.format(value)
+        return 'ok {}{} {}'.format(ascii_lowercase[move[1]], move[0] + 1,
+                                   value)
+
+    def _remove_socket(self, path: str) -> None:
+        """
+        Removes a socket left at path, but never any other kind of file
+        """
+        if not os.path.exists(path):
+            return
+        if not stat.S_ISSOCK(os.stat(path).st_mode):
+            raise QueryException('{} exists and is not a socket'.format(path))
+        os.remove(path)
+
+
+async def query(path: str, requests: List[str]) -> List[str]:
+    """
+    Sends requests to a QueryServer listening at path, and returns
+    the answers
+    """
+    reader, writer = await asyncio.open_unix_connection(path)
+    try:
+        writer.write(''.join(request + '\n' for request in requests)
+                     .encode('utf-8'))
+        await writer.drain()
+        answers = []
+        for _ in requests:
+            answers.append((await reader.readline()).decode('utf-8').strip())
+        return answers
+    finally:
+        writer.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Loads a DAG or tablebase once and answers best move '
+                    'and value queries for it over a unix socket'
+    )
+    parser.add_argument(
+        'filename',
+        help='DAG file, binary DAG file or tablebase to answer queries for')
+    parser.add_argument(
+        '-s',
+        '--socket',
+        help='Path of the unix socket to listen on. Default is minimax.sock',
+        default='minimax.sock')
+    parser.add_argument(
+        '--batch',
+        help='Most requests answered in one batch. Default is 256',
+        type=int,
+        default=256)
+    args = parser.parse_args()
+    try:
+        server = QueryServer(args.filename, args.batch)
+    except ParserException as e:
+        parser.error(str(e))
+    try:
+        asyncio.run(server.serve(args.socket))
+    except QueryException as e:
+        parser.error(str(e))
+    except KeyboardInterrupt:
+        pass
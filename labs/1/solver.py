@@ -1,8 +1,15 @@
 from node import Node
+from graph import Graph, GraphNode
+from space import SearchSpace, NodeSpace
 from enum import Enum
-from typing import List, Tuple
+from typing import Callable, Hashable, Iterator, List, Tuple
+from contextlib import contextmanager
 from math import inf
-from queue import Queue
+from time import perf_counter
+from concurrent.futures import ProcessPoolExecutor
+from transposition import TranspositionTable, TableEntry, Bound
+from ordering import MoveOrder
+from stats import SearchStats
 
 
 class SolveType(Enum):
@@ -10,6 +17,13 @@ class SolveType(Enum):
     MIN = 1
 
 
+class Engine(Enum):
+    ALPHA_BETA = 0
+    PVS = 1
+    MTDF = 2
+    BOTTOM_UP = 3
+
+
 class SolveStep:
     def __init__(self, parent: Node, selected: Node,
                  select_type: 'SolveType', value: int) -> None:
@@ -35,109 +49,814 @@ class SolveStep:
         return self._value
 
 
+class _BudgetExceeded(Exception):
+    """
+    Unwinds a depth limited search once deepen runs out of budget
+    """
+
+    def __init__(self, *args: object) -> None:
+        super().__init__(*args)
+
+
 class Solver:
 
     """
     Solver contains the logic that performs minimax and alpha-beta minimax search
     NOTE:
-    Both minimax and alphabeta recursion step functions return a tuple of [Node, int]
-    The node returned is also the same as the node passed in
+    Both minimax and alphabeta search functions return a tuple of [state, int]
+    The state returned is also the same as the state passed in
     Arguably, I don't need to do it this way,
     but IMO it works out cleaner this way
+
+    The searches walk a SearchSpace, and only turn states into Nodes
+    when they report a step.
+    Both searches walk the DAG with an explicit stack instead of recursing,
+    so the depth of the DAG is only limited by memory.
+    Each stack frame is a list, see the search functions for the layout.
+    The steps come out in the same order a recursive post-order walk would
+    produce them
+
+    If a transposition table is provided, nodes reached through more than one
+    parent are only searched once. Subtrees answered from the table don't
+    produce steps again. The table is keyed by SearchSpace.key, so a space
+    can also let equivalent states share an entry
+
+    With more than one worker, the children of the root are searched on a
+    process pool, see _parallel
+
+    If a move order is provided, alpha beta tries the children most likely
+    to cause a cutoff first. deepen runs depth limited alpha beta searches
+    until a node or time budget runs out
+
+    If stats are provided, the searches count the nodes they visit, the
+    leaves they evaluate and their cutoffs into them. Workers count their
+    own and send them back with their steps, speculative searches that
+    get thrown away aren't counted
     """
 
-    def solve(self, start: Node, start_type: 'SolveType',
-              prune: bool = False) -> 'Queue[SolveStep]':
+    def __init__(self, table: TranspositionTable = None,
+                 workers: int = 1, ordering: MoveOrder = None,
+                 stats: SearchStats = None) -> None:
+        self._table = table
+        self._workers = workers
+        self._ordering = ordering
+        self._stats = stats
+        self._budget = (None, None)
+        self._nodes = 0
+        self._depth = 0
+        self._complete = False
+        self._horizon = False
+
+    @property
+    def table(self) -> TranspositionTable:
+        return self._table
+
+    @property
+    def workers(self) -> int:
+        return self._workers
+
+    @property
+    def ordering(self) -> MoveOrder:
+        return self._ordering
+
+    @property
+    def stats(self) -> SearchStats:
+        return self._stats
+
+    def solve(self, start: Hashable, start_type: 'SolveType',
+              prune: bool = False, space: SearchSpace = None,
+              engine: 'Engine' = Engine.ALPHA_BETA,
+              on_step: Callable[[SolveStep], None] = None) -> SolveStep:
         """
         Solves the provided DAG using minimax
+        Returns the step where start picks its child, or None if start is
+        a leaf or was answered from the transposition table.
+        Every step is handed to on_step as soon as the search makes it,
+        if one is provided. Without one, no SolveSteps are built except
+        the one returned
+        Nodes from a Graph are searched by id, straight from its arrays.
+        If a space is provided, start is a state in that space instead
+        of a node, and the graph is explored as the search goes
+        With pruning, engine picks plain alpha beta, principal variation
+        search or MTD(f). They all pick the same value and child for start.
+        Only plain alpha beta is searched on more than one worker
+        The bottom up engine never prunes, and gives the same steps as minimax
         """
-        if prune == True:
-            return self._alpha_beta(start, start_type)
+        if space is None:
+            space, start = self._space(start)
+        parallel = self._workers > 1 and (
+            not prune or engine == Engine.ALPHA_BETA)
+        if engine == Engine.BOTTOM_UP and not isinstance(space, Graph):
+            space, start = Graph.from_space(space, start), 0
+        elif parallel and isinstance(space, NodeSpace):
+            # Workers unpickle a Graph much faster than a Node per node
+            space, start = Graph.from_node(start), 0
+        report = _Report(space, on_step)
+        if engine == Engine.BOTTOM_UP:
+            self._bottom_up(space, start, start_type, report)
+        elif parallel:
+            self._parallel(space, start, start_type, prune, report)
+        elif prune == True:
+            if engine == Engine.PVS:
+                self._alpha_beta(space, start, start_type, report, True)
+            elif engine == Engine.MTDF:
+                self._mtdf(space, start, start_type, report)
+            else:
+                self._alpha_beta(space, start, start_type, report)
         else:
-            return self._minimax(start, start_type)
+            self._minimax(space, start, start_type, report)
+        return report.decision()
 
-    def _minimax(self, start: Node,
-                 start_type: 'SolveType') -> 'Queue[SolveStep]':
+    def _minimax(self, space: SearchSpace, start: Hashable,
+                 start_type: 'SolveType', report: '_Report') -> None:
         """
-        Header recurse function for minimax
+        Header function for minimax
         """
-        queue = Queue()
-        self._minimax_step(start, start_type, queue)
-        return queue
+        self._minimax_search(space, start, start_type, report)
 
-    def _minimax_step(self, start: Node, start_type: 'SolveType',
-                      steps: 'Queue[SolveStep]') -> Tuple[Node, int]:
+    def _minimax_search(self, space: SearchSpace, start: Hashable, start_type: 'SolveType',
+                        report: '_Report') -> Tuple[Hashable, int]:
         """
-        Recurses into nodes and their children
+        Walks the DAG below start and selects the best child for every node
+        Frames are [node, type, children, next child index, chosen node, chosen value]
+        Ties go to the first child, same as max()/min()
         """
-        if start.is_leaf:
-            return [start, start.value]
-        next_level_type = self._switch_type(start_type)
-        traverse_results = [self._minimax_step(
-            x, next_level_type, steps) for x in start.children]
-        should_choose = self._selector(traverse_results, start_type)
-        step = SolveStep(start, should_choose[0], start_type, should_choose[1])
-        steps.put(step)
-        return [start, should_choose[1]]
+        is_leaf = space.is_leaf
+        children_of = space.children
+        stats = self._stats
+        if is_leaf(start):
+            if stats is not None:
+                stats.leaf(0)
+            return [start, space.value(start)]
+        table = self._table
+        key = space.key
+        if table is not None:
+            entry = table.probe(key(start), start_type)
+            if entry is not None and entry.bound == Bound.EXACT:
+                return [start, entry.value]
+        if stats is not None:
+            stats.visit(0)
+        stack = [[start, start_type, children_of(start), 0, None, None]]
+        while True:
+            frame = stack[-1]
+            children = frame[2]
+            index = frame[3]
+            if index < len(children):
+                child = children[index]
+                frame[3] = index + 1
+                if is_leaf(child):
+                    if stats is not None:
+                        stats.leaf(len(stack))
+                    value = space.value(child)
+                else:
+                    child_type = self._switch_type(frame[1])
+                    entry = None
+                    if table is not None:
+                        entry = table.probe(key(child), child_type)
+                    if entry is not None and entry.bound == Bound.EXACT:
+                        value = entry.value
+                    else:
+                        if stats is not None:
+                            stats.visit(len(stack))
+                        stack.append(
+                            [child, child_type, children_of(child), 0, None, None])
+                        continue
+            else:
+                stack.pop()
+                child = frame[0]
+                value = frame[5]
+                report(child, frame[4], frame[1], value)
+                if table is not None:
+                    table.store(key(child), frame[1], value,
+                                Bound.EXACT, frame[4])
+                if len(stack) == 0:
+                    return [child, value]
+                frame = stack[-1]
+            if frame[4] is None or (
+                    value > frame[5] if frame[1] == SolveType.MAX else value < frame[5]):
+                frame[4] = child
+                frame[5] = value
 
-    def _selector(self, nodes: List[Tuple[Node, int]],
-                  select_type: 'SolveType') -> Tuple[Node, int]:
+    def _bottom_up(self, space: Graph, start: int,
+                   start_type: 'SolveType', report: '_Report') -> None:
         """
-        Helper function to select best node among children
+        Minimax where every value is worked out up front with NumPy,
+        see vectorised.py.
+        The steps are then replayed in the order _minimax reports them,
+        looking the choices up instead of comparing children. If only the
+        last step is wanted and there is no table to fill, only the root
+        is looked up
         """
-        if select_type == SolveType.MAX:
-            return max(nodes, key=lambda k: k[1])
-        else:
-            return min(nodes, key=lambda k: k[1])
+        # NumPy is only needed for this engine
+        from vectorised import BottomUp
+        solved = BottomUp(space)
+        if report.streaming or self._table is not None or \
+                self._stats is not None:
+            self._replay(space, start, start_type, solved, report)
+        elif not space.is_leaf(start):
+            report(start, solved.chosen(start, start_type), start_type,
+                   solved.value(start, start_type))
+
+    def _replay(self, space: SearchSpace, start: Hashable, start_type: 'SolveType',
+                solved: 'BottomUp', report: '_Report') -> None:
+        """
+        Walks the DAG below start like _minimax_search, but takes every
+        value and choice from solved
+        Frames are [node, type, children, next child index]
+        """
+        is_leaf = space.is_leaf
+        children_of = space.children
+        stats = self._stats
+        if is_leaf(start):
+            if stats is not None:
+                stats.leaf(0)
+            return
+        table = self._table
+        key = space.key
+        if table is not None:
+            entry = table.probe(key(start), start_type)
+            if entry is not None and entry.bound == Bound.EXACT:
+                return
+        if stats is not None:
+            stats.visit(0)
+        stack = [[start, start_type, children_of(start), 0]]
+        while len(stack) > 0:
+            frame = stack[-1]
+            children = frame[2]
+            index = frame[3]
+            if index < len(children):
+                child = children[index]
+                frame[3] = index + 1
+                if is_leaf(child):
+                    if stats is not None:
+                        stats.leaf(len(stack))
+                    continue
+                child_type = self._switch_type(frame[1])
+                if table is not None:
+                    entry = table.probe(key(child), child_type)
+                    if entry is not None and entry.bound == Bound.EXACT:
+                        continue
+                if stats is not None:
+                    stats.visit(len(stack))
+                stack.append([child, child_type, children_of(child), 0])
+            else:
+                stack.pop()
+                state = frame[0]
+                chosen = solved.chosen(state, frame[1])
+                value = solved.value(state, frame[1])
+                report(state, chosen, frame[1], value)
+                if table is not None:
+                    table.store(key(state), frame[1], value,
+                                Bound.EXACT, chosen)
 
-    def _alpha_beta(self, start: Node,
-                    start_type: 'SolveType') -> 'Queue[SolveStep]':
+    def _alpha_beta(self, space: SearchSpace, start: Hashable, start_type: 'SolveType',
+                    report: '_Report', pvs: bool = False) -> None:
         """
-        Header recurse function for alpha-beta pruned minimax
+        Header function for alpha-beta pruned minimax
         """
-        queue = Queue()
-        self._alpha_beta_step(start, start_type, -inf, inf, queue)
-        return queue
+        self._alpha_beta_search(space, start, start_type, -inf, inf, report,
+                                pvs=pvs)
 
-    def _alpha_beta_step(self, start: Node, start_type: 'SolveType',
-                         alpha: int, beta: int, steps: 'Queue[SolveStep]') -> Tuple[Node, int]:
+    def _mtdf(self, space: SearchSpace, start: Hashable,
+              start_type: 'SolveType', report: '_Report') -> None:
         """
-        Recurse step for alpha beta pruning
-        With some clever functional programming, this code can probably be DRY'd up
-        But it would be a bit more confusing to read, and its not worth the effort
-        for a school assignment
+        MTD(f) finds the value of start with null window alpha beta searches
+        only, each of which tells whether the value is at least some test
+        value, until the lower and upper bounds meet.
+        The searches here don't return a value when they fail, so the bounds
+        only move to the test value. Tests start at space.estimate, step
+        away from it in growing steps, and bisect once both bounds are known.
+        Every pass reuses the transposition table, so a temporary one is used
+        if the solver doesn't have one.
+        The steps of every pass are reported, followed by the root picking
+        its child the same way _alpha_beta does
         """
-        if start.is_leaf:
-            return [start, start.value]
-        next_level_type = self._switch_type(start_type)
+        if space.is_leaf(start):
+            return
+        table = self._table
+        if table is None:
+            self._table = TranspositionTable()
+        try:
+            value = self._mtdf_value(space, start, start_type, report)
+            chosen = self._mtdf_choice(space, start, start_type, value, report)
+        finally:
+            self._table = table
+        report(start, chosen, start_type, value)
+
+    def _mtdf_value(self, space: SearchSpace, start: Hashable,
+                    start_type: 'SolveType', report: '_Report') -> int:
+        """
+        Narrows the value of start down with null window searches
+        A search with window (test - 1, test) fails high at a max node
+        and returns a value at a min node exactly when the value is
+        at least test
+        """
+        lower = -inf
+        upper = inf
+        test = space.estimate(start)
+        step = 1
+        while lower < upper:
+            result = self._alpha_beta_search(
+                space, start, start_type, test - 1, test, report)
+            if (result is None) == (start_type == SolveType.MAX):
+                lower = test
+            else:
+                upper = test - 1
+            if lower == -inf:
+                test = upper + 1 - step
+                step *= 2
+            elif upper == inf:
+                test = lower + step
+                step *= 2
+            else:
+                test = (lower + upper + 1) // 2
+        return lower
+
+    def _mtdf_choice(self, space: SearchSpace, start: Hashable,
+                     start_type: 'SolveType', value: int,
+                     report: '_Report') -> Hashable:
+        """
+        Picks the child _alpha_beta would: it keeps the last leaf with the
+        best value, because leaves replace ties, and otherwise the first
+        other child with the best value, because later ties get pruned.
+        Children are checked with a null window search around value
+        """
+        children = space.children(start)
+        for child in reversed(children):
+            if space.is_leaf(child) and space.value(child) == value:
+                return child
+        child_type = self._switch_type(start_type)
         if start_type == SolveType.MAX:
-            chosen_set = [None, -inf]
-            for child in start.children:
-                chosen = self._alpha_beta_step(
-                    child, next_level_type, alpha, beta, steps)
-                if chosen is None:
-                    continue
-                chosen_set = max(chosen, chosen_set, key=lambda k: k[1])
-                if chosen_set[1] >= beta:
-                    return None
-                alpha = chosen_set[1]
-            step = SolveStep(start, chosen_set[0], start_type, chosen_set[1])
-            steps.put(step)
-            return [start, chosen_set[1]]
+            low, high = value - 1, value
         else:
-            chosen_set = [None, inf]
-            for child in start.children:
-                chosen = self._alpha_beta_step(
-                    child, next_level_type, alpha, beta, steps)
+            low, high = value, value + 1
+        with self._below(1):
+            for child in children:
+                if not space.is_leaf(child) and self._alpha_beta_search(
+                        space, child, child_type, low, high, report) is not None:
+                    return child
+        return None
+
+    def _alpha_beta_search(self, space: SearchSpace, start: Hashable, start_type: 'SolveType',
+                           alpha: int, beta: int, report: '_Report',
+                           limit: int = None, pvs: bool = False) -> Tuple[Hashable, int]:
+        """
+        Walks the DAG below start with alpha beta pruning
+        Frames are [node, type, children, next child index,
+        alpha, beta, starting bound, chosen node, chosen value, cut short,
+        null window state]
+        The starting bound is alpha for max nodes and beta for min nodes,
+        it decides what kind of bound gets stored in the transposition table.
+        A node which gets pruned returns None to its parent, which skips it
+        Ties go to the later child
+        With a limit, only that many plies below start are searched, and
+        non leaf states at the limit are valued with space.estimate.
+        A node's ply is its position in the stack. Nodes whose value
+        depends on an estimate are cut short, and get stored in the table
+        with the depth they were searched to. Nodes that aren't cut short
+        were searched to the leaves, so they are stored without a depth
+        With pvs, this is principal variation search: once a node has a
+        chosen child, the rest are first searched with a null window, which
+        only tells whether they are better. A child that is better gets
+        searched again with the full window. The null window state is 0
+        normally, 1 while a child is searched with a null window, and 2 when
+        it has to be searched again
+        """
+        is_leaf = space.is_leaf
+        children_of = space.children
+        stats = self._stats
+        if is_leaf(start):
+            if stats is not None:
+                stats.leaf(0)
+            return [start, space.value(start)]
+        table = self._table
+        ordering = self._ordering
+        key = space.key
+        if table is not None:
+            entry = table.probe(key(start), start_type, limit)
+            if entry is not None:
+                cached = self._table_cutoff(
+                    start, start_type, entry, alpha, beta)
+                if cached != False:
+                    self._horizon = entry.depth is not None
+                    return cached
+        if stats is not None:
+            stats.visit(0)
+        children = children_of(start)
+        if ordering is not None:
+            children = ordering.order(space, start, children, 0)
+        stack = [self._alpha_beta_frame(
+            start, start_type, children, alpha, beta)]
+        while True:
+            frame = stack[-1]
+            children = frame[2]
+            index = frame[3]
+            if index < len(children):
+                child = children[index]
+                frame[3] = index + 1
+                full_window = True
+                if pvs:
+                    full_window = frame[10] == 2 or frame[7] is None
+                    frame[10] = 0
+                if is_leaf(child):
+                    if stats is not None:
+                        stats.leaf(len(stack))
+                    chosen = [child, space.value(child)]
+                elif limit is not None and len(stack) >= limit:
+                    if stats is not None:
+                        stats.leaf(len(stack))
+                    frame[9] = True
+                    chosen = [child, space.estimate(child)]
+                else:
+                    ply = len(stack)
+                    child_type = self._switch_type(frame[1])
+                    low = frame[4]
+                    high = frame[5]
+                    if not full_window:
+                        if frame[1] == SolveType.MAX and -inf < low < high - 1:
+                            high = low + 1
+                            frame[10] = 1
+                        elif frame[1] == SolveType.MIN and low + 1 < high < inf:
+                            low = high - 1
+                            frame[10] = 1
+                    chosen = False
+                    if table is not None:
+                        entry = table.probe(
+                            key(child), child_type,
+                            None if limit is None else limit - ply)
+                        if entry is not None:
+                            chosen = self._table_cutoff(
+                                child, child_type, entry, low, high)
+                            if chosen != False and entry.depth is not None:
+                                frame[9] = True
+                    if chosen == False:
+                        if limit is not None:
+                            self._spend()
+                        if stats is not None:
+                            stats.visit(ply)
+                        children = children_of(child)
+                        if ordering is not None:
+                            children = ordering.order(
+                                space, child, children, ply)
+                        stack.append(self._alpha_beta_frame(
+                            child, child_type, children, low, high))
+                        continue
+            else:
+                stack.pop()
+                chosen = [frame[0], frame[8]]
+                report(frame[0], frame[7], frame[1], frame[8])
+                if frame[1] == SolveType.MAX:
+                    exact = frame[8] > frame[6]
+                    bound = Bound.EXACT if exact else Bound.UPPER
+                else:
+                    exact = frame[8] < frame[6]
+                    bound = Bound.EXACT if exact else Bound.LOWER
+                self._table_store(key(frame[0]), frame[1],
+                                  frame[8] if exact else frame[6],
+                                  bound, frame[7],
+                                  limit - len(stack) if frame[9] else None)
+                if ordering is not None and frame[7] is not None:
+                    ordering.best(key(frame[0]), key(frame[7]))
+                if len(stack) == 0:
+                    self._horizon = frame[9]
+                    return chosen
+                if frame[9]:
+                    stack[-1][9] = True
+                frame = stack[-1]
+            if frame[10] == 1:
+                # A child that failed low on the null window is no better,
+                # otherwise its real value is needed
+                frame[10] = 0
+                if chosen is not None:
+                    frame[10] = 2
+                    frame[3] -= 1
+                    continue
+            if chosen is None:
+                continue
+            if frame[1] == SolveType.MAX:
+                if chosen[1] >= frame[8]:
+                    frame[7] = chosen[0]
+                    frame[8] = chosen[1]
+                if frame[8] >= frame[5]:
+                    self._cutoff(key, frame, len(stack) - 1,
+                                 limit, Bound.LOWER)
+                    stack.pop()
+                    if len(stack) == 0:
+                        self._horizon = frame[9]
+                        return None
+                    if frame[9]:
+                        stack[-1][9] = True
+                    if stack[-1][10] == 1:
+                        stack[-1][10] = 0
+                    continue
+                frame[4] = frame[8]
+            else:
+                if chosen[1] <= frame[8]:
+                    frame[7] = chosen[0]
+                    frame[8] = chosen[1]
+                if frame[8] <= frame[4]:
+                    self._cutoff(key, frame, len(stack) - 1,
+                                 limit, Bound.UPPER)
+                    stack.pop()
+                    if len(stack) == 0:
+                        self._horizon = frame[9]
+                        return None
+                    if frame[9]:
+                        stack[-1][9] = True
+                    if stack[-1][10] == 1:
+                        stack[-1][10] = 0
+                    continue
+                frame[5] = frame[8]
+
+    def _cutoff(self, key: Callable[[Hashable], Hashable], frame: list,
+                ply: int, limit: int, bound: Bound) -> None:
+        """
+        Records a node that failed high or low in the transposition table
+        and the move order.
+        Only the window is stored as the bound, not the chosen value: a child
+        whose own children were all pruned reports inf or -inf, which is
+        enough to cause the cutoff but isn't a real bound
+        """
+        if self._stats is not None:
+            self._stats.cutoff(ply)
+        remaining = limit - ply if frame[9] else None
+        value = frame[5] if bound == Bound.LOWER else frame[4]
+        self._table_store(key(frame[0]), frame[1], value,
+                          bound, frame[7], remaining)
+        ordering = self._ordering
+        if ordering is not None and frame[7] is not None:
+            ordering.cutoff(key(frame[7]), ply,
+                            1 if limit is None else limit - ply)
+            ordering.best(key(frame[0]), key(frame[7]))
+
+    def deepen(self, start: Hashable, start_type: 'SolveType',
+               space: SearchSpace = None, nodes: int = None,
+               seconds: float = None, max_depth: int = None,
+               on_step: Callable[[SolveStep], None] = None) -> SolveStep:
+        """
+        Iterative deepening alpha beta. Searches 1 ply deep, then 2, and so on,
+        until the search reaches every leaf, max_depth is reached, or the
+        budget of nodes searched or seconds runs out.
+        Returns the root step of the deepest search that finished, which is
+        the best answer found so far. The first search always finishes.
+        Only the steps of that search are handed to on_step, so they are
+        held back until it is known which search that is.
+        With a move order, each search tries the best children of the
+        previous one first
+        """
+        if space is None:
+            space, start = self._space(start)
+        deadline = None if seconds is None else perf_counter() + seconds
+        self._nodes = 0
+        self._depth = 0
+        self._complete = False
+        self._budget = (None, None)
+        result = None
+        kept = []
+        depth = 1
+        while True:
+            self._horizon = False
+            steps = []
+            report = _Report(space, None if on_step is None else steps.append)
+            try:
+                self._alpha_beta_search(
+                    space, start, start_type, -inf, inf, report, depth)
+            except _BudgetExceeded:
+                break
+            finally:
+                self._budget = (nodes, deadline)
+            result = report.decision()
+            kept = steps
+            self._depth = depth
+            if not self._horizon:
+                self._complete = True
+                break
+            if depth == max_depth:
+                break
+            depth += 1
+        self._budget = (None, None)
+        for step in kept:
+            on_step(step)
+        return result
+
+    @property
+    def nodes(self) -> int:
+        """
+        Nodes searched by the last deepen
+        """
+        return self._nodes
+
+    @property
+    def depth(self) -> int:
+        """
+        Depth of the deepest search deepen finished
+        """
+        return self._depth
+
+    @property
+    def complete(self) -> bool:
+        """
+        Whether the last deepen searched all the way to the leaves
+        """
+        return self._complete
+
+    def _spend(self) -> None:
+        """
+        Counts a searched node against the deepen budget
+        The clock is only checked every 1024 nodes
+        """
+        self._nodes += 1
+        max_nodes, deadline = self._budget
+        if max_nodes is not None and self._nodes > max_nodes:
+            raise _BudgetExceeded()
+        if deadline is not None and self._nodes & 1023 == 0 and \
+                perf_counter() > deadline:
+            raise _BudgetExceeded()
+
+    def _parallel(self, space: SearchSpace, start: Hashable, start_type: 'SolveType',
+                  prune: bool, report: '_Report') -> None:
+        """
+        Searches the children of start on a process pool, Young Brothers Wait
+        style: the first child is searched here, then the rest are handed
+        out to the workers with the best alpha beta window known so far.
+        Results are merged in child order. A child that was searched with a
+        window that has since narrowed is searched again here with the
+        window the sequential search would have used, so the steps come out
+        the same as with one worker.
+        Every worker has its own transposition table and move order, so with
+        either of them the root value is the same, but the steps can differ.
+        Workers send their steps back as states
+        """
+        is_leaf = space.is_leaf
+        if is_leaf(start):
+            return
+        table = self._table
+        key = space.key
+        if table is not None:
+            entry = table.probe(key(start), start_type)
+            if entry is not None:
+                if prune:
+                    if self._table_cutoff(start, start_type, entry,
+                                          -inf, inf) != False:
+                        return
+                elif entry.bound == Bound.EXACT:
+                    return
+        stats = self._stats
+        if stats is not None:
+            stats.visit(0)
+        children = space.children(start)
+        child_type = self._switch_type(start_type)
+        frame = self._alpha_beta_frame(start, start_type, children, -inf, inf)
+        pending = {}
+        submitted = 1
+        with ProcessPoolExecutor(self._workers, initializer=_start_worker,
+                                 initargs=(space, table is not None,
+                                           self._ordering is not None,
+                                           stats is not None)) as pool:
+            for index, child in enumerate(children):
+                while index > 0 and submitted < len(children) and \
+                        len(pending) < self._workers:
+                    if not is_leaf(children[submitted]):
+                        pending[submitted] = (pool.submit(
+                            _search_child, children[submitted], child_type,
+                            frame[4], frame[5], prune, report.streaming),
+                            frame[4], frame[5])
+                    submitted += 1
+                task = pending.pop(index, None)
+                if is_leaf(child):
+                    if stats is not None:
+                        stats.leaf(1)
+                    chosen = [child, space.value(child)]
+                else:
+                    chosen = False
+                    if table is not None:
+                        entry = table.probe(key(child), child_type)
+                        if entry is not None and prune:
+                            chosen = self._table_cutoff(
+                                child, child_type, entry, frame[4], frame[5])
+                        elif entry is not None and entry.bound == Bound.EXACT:
+                            chosen = [child, entry.value]
+                    if chosen != False:
+                        if task is not None:
+                            task[0].cancel()
+                    elif task is not None and (
+                            not prune or task[1:] == (frame[4], frame[5])):
+                        chosen, steps, counted = task[0].result()
+                        for step in steps:
+                            report(*step)
+                        if stats is not None:
+                            stats.merge(counted, 1)
+                    else:
+                        if task is not None:
+                            task[0].cancel()
+                        with self._below(1):
+                            if prune:
+                                chosen = self._alpha_beta_search(
+                                    space, child, child_type,
+                                    frame[4], frame[5], report)
+                            else:
+                                chosen = self._minimax_search(
+                                    space, child, child_type, report)
                 if chosen is None:
                     continue
-                chosen_set = min(chosen, chosen_set, key=lambda k: k[1])
-                if chosen_set[1] <= alpha:
-                    return None
-                beta = chosen_set[1]
-            step = SolveStep(start, chosen_set[0], start_type, chosen_set[1])
-            steps.put(step)
-            return [start, chosen_set[1]]
+                if not prune:
+                    if frame[7] is None or (chosen[1] > frame[8]
+                                            if start_type == SolveType.MAX
+                                            else chosen[1] < frame[8]):
+                        frame[7] = chosen[0]
+                        frame[8] = chosen[1]
+                elif start_type == SolveType.MAX:
+                    if chosen[1] >= frame[8]:
+                        frame[7] = chosen[0]
+                        frame[8] = chosen[1]
+                    frame[4] = frame[8]
+                else:
+                    if chosen[1] <= frame[8]:
+                        frame[7] = chosen[0]
+                        frame[8] = chosen[1]
+                    frame[5] = frame[8]
+        report(start, frame[7], start_type, frame[8])
+        if not prune:
+            self._table_store(key(start), start_type, frame[8],
+                              Bound.EXACT, frame[7])
+        elif start_type == SolveType.MAX:
+            exact = frame[8] > frame[6]
+            self._table_store(key(start), start_type,
+                              frame[8] if exact else frame[6],
+                              Bound.EXACT if exact else Bound.UPPER, frame[7])
+        else:
+            exact = frame[8] < frame[6]
+            self._table_store(key(start), start_type,
+                              frame[8] if exact else frame[6],
+                              Bound.EXACT if exact else Bound.LOWER, frame[7])
+
+    @contextmanager
+    def _below(self, ply: int) -> Iterator[None]:
+        """
+        Counts the stats of searches started in the with block as if
+        they started 'ply' plies below the node the solver started at
+        """
+        stats = self._stats
+        if stats is None:
+            yield
+            return
+        self._stats = SearchStats()
+        try:
+            yield
+        finally:
+            stats.merge(self._stats, ply)
+            self._stats = stats
+
+    def _alpha_beta_frame(self, start: Hashable, start_type: 'SolveType',
+                          children: List[Hashable], alpha: int, beta: int) -> list:
+        """
+        Builds the stack frame for a node in the alpha beta search
+        """
+        if start_type == SolveType.MAX:
+            return [start, start_type, children, 0,
+                    alpha, beta, alpha, None, -inf, False, 0]
+        return [start, start_type, children, 0,
+                alpha, beta, beta, None, inf, False, 0]
+
+    def _table_cutoff(self, start: Hashable, start_type: 'SolveType',
+                      entry: TableEntry, alpha: int, beta: int) -> Tuple[Hashable, int]:
+        """
+        Decides whether a table entry answers the search at start.
+        Returns whatever _alpha_beta_step would have returned,
+        or False if the node still needs to be searched
+        A max node fails high (returns None) once its value reaches beta,
+        and a min node fails low once its value drops to alpha
+        """
+        value = entry.value
+        if start_type == SolveType.MAX:
+            if entry.bound != Bound.UPPER and value >= beta:
+                return None
+            if entry.bound != Bound.LOWER and value <= alpha:
+                return [start, value]
+        else:
+            if entry.bound != Bound.LOWER and value <= alpha:
+                return None
+            if entry.bound != Bound.UPPER and value >= beta:
+                return [start, value]
+        if entry.bound == Bound.EXACT:
+            return [start, value]
+        return False
+
+    def _table_store(self, key: Hashable, start_type: 'SolveType', value: int,
+                     bound: Bound, best: Hashable, depth: int = None) -> None:
+        """
+        Stores a search result if a transposition table is in use
+        """
+        if self._table is not None:
+            self._table.store(key, start_type, value, bound, best, depth)
+
+    def _space(self, start: Node) -> Tuple[SearchSpace, Hashable]:
+        """
+        Picks the space to search for a node, and the state it starts at
+        """
+        if isinstance(start, GraphNode):
+            return start.graph, start.index
+        return NodeSpace(), start
 
     def _switch_type(self, select_type: 'SolveType') -> 'SolveType':
         """
@@ -146,3 +865,94 @@ class Solver:
         if select_type == SolveType.MAX:
             return SolveType.MIN
         return SolveType.MAX
+
+
+class _Report:
+    """
+    Where a search reports its steps, as states.
+    SolveSteps are only built if there is an on_step to hand them to,
+    otherwise only the latest step is kept, which ends up being the one
+    for the node the search started at
+    """
+
+    def __init__(self, space: SearchSpace,
+                 on_step: Callable[[SolveStep], None] = None) -> None:
+        self._node = space.node
+        self._on_step = on_step
+        self._step = None
+        self._parent = None
+        self._selected = None
+        self._select_type = None
+        self._value = None
+
+    def __call__(self, parent: Hashable, selected: Hashable,
+                 select_type: 'SolveType', value: int) -> None:
+        if self._on_step is None:
+            self._parent = parent
+            self._selected = selected
+            self._select_type = select_type
+            self._value = value
+            return
+        node = self._node
+        self._step = SolveStep(node(parent),
+                               None if selected is None else node(selected),
+                               select_type, value)
+        self._on_step(self._step)
+
+    @property
+    def streaming(self) -> bool:
+        """
+        Whether every step is wanted, or just the last one
+        """
+        return self._on_step is not None
+
+    def decision(self) -> SolveStep:
+        """
+        The latest step, or None if nothing was reported
+        """
+        if self._on_step is not None or self._select_type is None:
+            return self._step
+        node = self._node
+        selected = self._selected
+        return SolveStep(node(self._parent),
+                         None if selected is None else node(selected),
+                         self._select_type, self._value)
+
+
+# The space and solver of a worker process, set up once per worker
+_worker: Tuple[SearchSpace, Solver] = None
+
+
+def _start_worker(space: SearchSpace, transposition: bool,
+                  ordering: bool, stats: bool) -> None:
+    global _worker
+    table = TranspositionTable() if transposition else None
+    _worker = (space,
+               Solver(table, ordering=MoveOrder() if ordering else None,
+                      stats=SearchStats() if stats else None))
+
+
+def _search_child(child: Hashable, child_type: SolveType, alpha: int, beta: int,
+                  prune: bool, collect: bool) -> Tuple[Tuple[Hashable, int], List[tuple], SearchStats]:
+    """
+    Searches one child of the root in a worker process.
+    If collect is set, steps are sent back as
+    (parent, selected, select type, value) tuples.
+    The stats are only for this child, if the solver keeps them
+    """
+    space, solver = _worker
+    steps = []
+    if solver.stats is not None:
+        solver._stats = SearchStats()
+
+    def report(parent: Hashable, selected: Hashable,
+               select_type: SolveType, value: int) -> None:
+        if collect:
+            steps.append((parent, selected, select_type, value))
+
+    if prune:
+        chosen = solver._alpha_beta_search(
+            space, child, child_type, alpha, beta, report)
+    else:
+        chosen = solver._minimax_search(space, child, child_type, report)
+    return chosen, steps, solver.stats
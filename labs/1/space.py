@@ -0,0 +1,66 @@
+from node import Node
+from typing import Hashable, List
+
+
+class SearchSpace:
+    """
+    SearchSpace is what the solver searches through.
+    A state can be anything hashable that identifies a position,
+    such as a Node, or a node id in a Graph.
+    The solver only ever touches states through these functions,
+    and only turns them into Nodes when it reports a SolveStep
+    """
+
+    def is_leaf(self, state: Hashable) -> bool:
+        raise NotImplementedError
+
+    def value(self, state: Hashable) -> int:
+        """
+        Value of a leaf state
+        """
+        raise NotImplementedError
+
+    def children(self, state: Hashable) -> List[Hashable]:
+        """
+        States reachable in one move from a non leaf state
+        """
+        raise NotImplementedError
+
+    def node(self, state: Hashable) -> Node:
+        """
+        Returns something with the Node API for the state,
+        which is what ends up in a SolveStep
+        """
+        raise NotImplementedError
+
+    def key(self, state: Hashable) -> Hashable:
+        """
+        Transposition table key for the state.
+        States with the same key must have the same value
+        """
+        return state
+
+    def estimate(self, state: Hashable) -> int:
+        """
+        Guess at the value of a non leaf state, used when a depth limited
+        search stops above the leaves. DAGs have nothing better than 0
+        """
+        return 0
+
+
+class NodeSpace(SearchSpace):
+    """
+    NodeSpace searches a graph of Nodes. The states are the nodes themselves
+    """
+
+    def is_leaf(self, state: Node) -> bool:
+        return state.is_leaf
+
+    def value(self, state: Node) -> int:
+        return state.value
+
+    def children(self, state: Node) -> List[Node]:
+        return state.children
+
+    def node(self, state: Node) -> Node:
+        return state
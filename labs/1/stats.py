@@ -0,0 +1,168 @@
+from contextlib import contextmanager, nullcontext
+from typing import ContextManager, Dict, Iterator, List
+from time import perf_counter
+import json
+
+
+class SearchStats:
+    """
+    SearchStats collects where a run spends its time, and what the search did.
+    Phases are timed with phase(), and can be nested, in which case the
+    inner phase's time isn't counted towards the outer one, so the phase
+    times add up to the total.
+    Nodes, leaves and cutoffs are counted per ply, where the node the
+    search started at is ply 0. Nodes are the non leaf nodes the search
+    expanded, leaves are leaves valued plus nodes valued with an estimate
+    at the depth limit
+    """
+
+    def __init__(self) -> None:
+        self._phases: Dict[str, float] = {}
+        # [name, start time, time spent in inner phases]
+        self._open: List[list] = []
+        self._nodes: List[int] = []
+        self._leaves: List[int] = []
+        self._cutoffs: List[int] = []
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """
+        Times everything done inside a with block as phase 'name'
+        """
+        frame = [name, perf_counter(), 0.0]
+        self._open.append(frame)
+        try:
+            yield
+        finally:
+            self._open.pop()
+            elapsed = perf_counter() - frame[1]
+            self._phases[name] = self._phases.get(name, 0.0) + \
+                elapsed - frame[2]
+            if len(self._open) > 0:
+                self._open[-1][2] += elapsed
+
+    def visit(self, ply: int) -> None:
+        self._count(self._nodes, ply)
+
+    def leaf(self, ply: int) -> None:
+        self._count(self._leaves, ply)
+
+    def cutoff(self, ply: int) -> None:
+        self._count(self._cutoffs, ply)
+
+    def merge(self, other: 'SearchStats', ply: int = 0) -> None:
+        """
+        Adds the counts of a search that started 'ply' plies below
+        this one, like a child searched by another process
+        """
+        for mine, theirs in ((self._nodes, other._nodes),
+                             (self._leaves, other._leaves),
+                             (self._cutoffs, other._cutoffs)):
+            for depth, count in enumerate(theirs):
+                self._count(mine, depth + ply, count)
+        for name, seconds in other._phases.items():
+            self._phases[name] = self._phases.get(name, 0.0) + seconds
+
+    @property
+    def phases(self) -> Dict[str, float]:
+        """
+        Seconds spent in every phase, in the order they first ran
+        """
+        return dict(self._phases)
+
+    @property
+    def nodes(self) -> int:
+        return sum(self._nodes)
+
+    @property
+    def leaves(self) -> int:
+        return sum(self._leaves)
+
+    @property
+    def cutoffs(self) -> List[int]:
+        """
+        Number of cutoffs at every ply
+        """
+        return list(self._cutoffs)
+
+    @property
+    def depth(self) -> int:
+        """
+        The deepest ply anything was visited at
+        """
+        return max(len(self._nodes), len(self._leaves)) - 1
+
+    def effective_branching_factor(self) -> float:
+        """
+        The branching factor b of a uniform tree as deep as the search,
+        with as many nodes below the root as the search visited:
+        b + b^2 + ... + b^depth = visited nodes below the root.
+        Found by bisection, it is 0 if nothing below the root was visited
+        """
+        depth = self.depth
+        visited = self.nodes + self.leaves - 1
+        if depth < 1 or visited < 1:
+            return 0.0
+        low, high = 0.0, float(visited)
+        for _ in range(100):
+            middle = (low + high) / 2
+            total = 0.0
+            power = 1.0
+            for _ in range(depth):
+                power *= middle
+                total += power
+                if total > visited:
+                    break
+            if total > visited:
+                high = middle
+            else:
+                low = middle
+        return low
+
+    def to_dict(self) -> dict:
+        return {
+            'phases': self.phases,
+            'total seconds': sum(self._phases.values()),
+            'nodes': self.nodes,
+            'leaves': self.leaves,
+            'depth': max(self.depth, 0),
+            'cutoffs per ply': self.cutoffs,
+            'effective branching factor': self.effective_branching_factor()
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict())
+
+    def to_text(self) -> str:
+        """
+        The stats as lines of human readable text
+        """
+        lines = []
+        for name, seconds in self._phases.items():
+            lines.append('{:<12} {:10.6f}s'.format(name, seconds))
+        lines.append('{:<12} {:10.6f}s'.format(
+            'total', sum(self._phases.values())))
+        lines.append('nodes visited: {}, leaves evaluated: {}, '
+                     'deepest ply: {}'.format(self.nodes, self.leaves,
+                                              max(self.depth, 0)))
+        if len(self._cutoffs) > 0:
+            lines.append('cutoffs per ply: {}'.format(' '.join(
+                '{}:{}'.format(ply, count)
+                for ply, count in enumerate(self._cutoffs) if count > 0)))
+        lines.append('effective branching factor: {:.3f}'.format(
+            self.effective_branching_factor()))
+        return '\n'.join(lines)
+
+    def _count(self, counts: List[int], ply: int, amount: int = 1) -> None:
+        if ply >= len(counts):
+            counts.extend([0] * (ply + 1 - len(counts)))
+        counts[ply] += amount
+
+
+def phase(stats: SearchStats, name: str) -> ContextManager[None]:
+    """
+    Times a phase if there are stats to time it for
+    """
+    if stats is None:
+        return nullcontext()
+    return stats.phase(name)
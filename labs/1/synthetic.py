@@ -0,0 +1,154 @@
+from graph import Graph, GraphBuilder
+from parser import Parser
+from binary import BinaryParser
+from random import Random
+from typing import List
+import argparse
+
+
+class SyntheticException(Exception):
+    def __init__(self, *args: object) -> None:
+        super().__init__(*args)
+
+
+class SyntheticGenerator:
+    """
+    SyntheticGenerator builds random DAGs with a known shape, for
+    benchmarking the parser and solver on something other than tic tac toe.
+    The DAG is built a level at a time. Every node above the last level
+    gets 'branching' children, each of which is, with probability 'sharing',
+    a node already added to the next level, and otherwise a new one.
+    So sharing 0 gives a tree, and higher sharing gives fewer, more
+    shared nodes. Nodes on the last level are leaves.
+    Leaf values are drawn from 'values':
+    uniform is a whole number between low and high,
+    normal is a rounded gaussian with mean (low + high) / 2 and a sixth of
+    the range as its standard deviation, clamped to the range,
+    and outcome is low, the middle or high, like a loss, draw or win.
+    The same seed always gives the same DAG
+    """
+
+    distributions = ['uniform', 'normal', 'outcome']
+
+    def __init__(self, depth: int, branching: int, sharing: float = 0.0,
+                 values: str = 'uniform', low: int = -100, high: int = 100,
+                 seed: int = 0) -> None:
+        if depth < 0:
+            raise SyntheticException('depth can not be negative')
+        if branching < 1:
+            raise SyntheticException('branching factor must be at least 1')
+        if not 0.0 <= sharing <= 1.0:
+            raise SyntheticException('sharing must be between 0 and 1')
+        if values not in self.distributions:
+            raise SyntheticException('unknown value distribution {}'.format(
+                values))
+        if low > high:
+            raise SyntheticException('low can not be above high')
+        self._depth = depth
+        self._branching = branching
+        self._sharing = sharing
+        self._values = values
+        self._low = low
+        self._high = high
+        self._seed = seed
+
+    def generate_graph(self) -> Graph:
+        """
+        Generate a DAG, packed into a Graph
+        """
+        random = Random(self._seed)
+        builder = GraphBuilder()
+        level = [builder.add_node('n0')]
+        for _ in range(self._depth):
+            next_level: List[int] = []
+            for parent in level:
+                children = []
+                for _ in range(self._branching):
+                    child = None
+                    if len(next_level) > 0 and random.random() < self._sharing:
+                        child = next_level[random.randrange(len(next_level))]
+                        # A parent can only have a child once
+                        if child in children:
+                            child = None
+                    if child is None:
+                        child = builder.add_node('n{}'.format(len(builder)))
+                        next_level.append(child)
+                    children.append(child)
+                builder.set_children(parent, children)
+            level = next_level
+        for leaf in level:
+            builder.set_value(leaf, self._value(random))
+        return builder.build(0)
+
+    def _value(self, random: Random) -> int:
+        """
+        Draws a leaf value
+        """
+        low = self._low
+        high = self._high
+        if self._values == 'uniform':
+            return random.randint(low, high)
+        if self._values == 'normal':
+            value = round(random.gauss((low + high) / 2, (high - low) / 6))
+            return min(max(value, low), high)
+        return random.choice([low, (low + high) // 2, high])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Generates a random DAG with a given depth, branching '
+        'factor and amount of sharing'
+    )
+    parser.add_argument('filename', help='File to write DAG to')
+    parser.add_argument(
+        '-d',
+        '--depth',
+        help='Number of levels below the root. Default is 8',
+        type=int,
+        default=8)
+    parser.add_argument(
+        '-b',
+        '--branching',
+        help='Number of children of every non leaf node. Default is 3',
+        type=int,
+        default=3)
+    parser.add_argument(
+        '-s',
+        '--sharing',
+        help='Chance that a child is a node another parent already has. '
+             'Default is 0',
+        type=float,
+        default=0.0)
+    parser.add_argument(
+        '--values',
+        help='Distribution of leaf values. Default is uniform',
+        choices=SyntheticGenerator.distributions,
+        default='uniform')
+    parser.add_argument(
+        '--low',
+        help='Lowest leaf value. Default is -100',
+        type=int,
+        default=-100)
+    parser.add_argument(
+        '--high',
+        help='Highest leaf value. Default is 100',
+        type=int,
+        default=100)
+    parser.add_argument(
+        '--seed',
+        help='Random seed. Default is 0',
+        type=int,
+        default=0)
+    parser.add_argument(
+        '--binary',
+        help='Writes the binary DAG format instead of text. Default is false',
+        action='store_true',
+        default=False)
+    args = parser.parse_args()
+    graph = SyntheticGenerator(args.depth, args.branching, args.sharing,
+                               args.values, args.low, args.high,
+                               args.seed).generate_graph()
+    if args.binary:
+        BinaryParser().write_to_file(graph, args.filename)
+    else:
+        Parser().write_to_file(graph, args.filename)
@@ -0,0 +1,337 @@
+from tictactoe import TicTacToeBoard, TicTacToeException, TileState
+from generator import Generator
+from solver import Solver, SolveType, SolveStep
+from transposition import TranspositionTable
+from parser import ParserException
+from array import array
+from mmap import mmap, ACCESS_READ
+from os import fstat
+from string import ascii_lowercase
+from typing import Dict, Tuple
+import argparse
+import re
+import struct
+import sys
+
+
+class Tablebase:
+    """
+    Tablebase answers best move queries for one tic tac toe board shape
+    straight from a file, without generating or searching anything.
+    The file is an open addressing hash table over the canonical key of
+    every position the game can reach, and it is memory mapped, so a
+    lookup only touches the few slots it probes.
+    Values are from X's point of view, like the leaves from Generator.
+    Best moves are stored as tiles of the canonical board, and mapped
+    back onto the board that was asked about
+    """
+
+    magic = b'TTTB'
+    version = 1
+    # magic, version, byte order, starting player, width, height,
+    # win length, log2 of the number of slots, number of positions
+    header = struct.Struct('<4sBBbBBBB5xQ')
+    # Keys are stored plus one so that zero marks an empty slot,
+    # which leaves 63 bits for the two halves of a board key
+    max_tiles = 31
+
+    def __init__(self, filename: str) -> None:
+        with open(filename, 'rb') as file:
+            if fstat(file.fileno()).st_size < self.header.size:
+                raise ParserException(
+                    '{} is not a tablebase file'.format(filename))
+            file_map = mmap(file.fileno(), 0, access=ACCESS_READ)
+        try:
+            magic, version, byte_order, player, width, height, win_length, \
+                bits, positions = self.header.unpack_from(file_map)
+            if magic != self.magic or version != self.version:
+                raise ParserException(
+                    '{} is not a tablebase file'.format(filename))
+            if byte_order != self._byte_order():
+                raise ParserException(
+                    '{} was written on a machine with a different byte order'.format(filename))
+            slots = 1 << bits
+            if len(file_map) < self.header.size + 10 * slots:
+                raise ParserException('{} is truncated'.format(filename))
+        except ParserException:
+            file_map.close()
+            raise
+        view = memoryview(file_map)
+        start = self.header.size
+        self._views = [view[start:start + 8 * slots].cast('Q'),
+                       view[start + 8 * slots:start + 9 * slots].cast('b'),
+                       view[start + 9 * slots:start + 10 * slots].cast('b')]
+        view.release()
+        self._keys, self._values, self._moves = self._views
+        self._map = file_map
+        self._bits = bits
+        self._positions = positions
+        self._starting_player = TileState(player)
+        self._shape = (width, height, win_length)
+
+    @property
+    def starting_player(self) -> TileState:
+        return self._starting_player
+
+    @property
+    def width(self) -> int:
+        return self._shape[0]
+
+    @property
+    def height(self) -> int:
+        return self._shape[1]
+
+    @property
+    def win_length(self) -> int:
+        return self._shape[2]
+
+    def __len__(self) -> int:
+        return self._positions
+
+    def lookup(self, board: TicTacToeBoard) -> Tuple[int, Tuple[int, int]]:
+        """
+        Returns the value of the board and the best (row, column) to
+        play on it, or None for the move if the game is over
+        """
+        if (board.width, board.height, board.win_length) != self._shape:
+            raise TicTacToeException(
+                'tablebase is for {}x{} boards with {} in a row'.format(
+                    *self._shape))
+        key, moves = board.orientation()
+        slot = self._find(key)
+        if slot is None:
+            raise TicTacToeException('position can not be reached')
+        tile = self._moves[slot]
+        if tile < 0:
+            return self._values[slot], None
+        tile = moves.index(tile)
+        return self._values[slot], (tile // self.width, tile % self.width)
+
+    def best_move(self, board: TicTacToeBoard) -> Tuple[int, int]:
+        """
+        Returns the best (row, column) to play on the board,
+        or None if the game is over
+        """
+        return self.lookup(board)[1]
+
+    def value(self, board: TicTacToeBoard) -> int:
+        """
+        Returns the value of the board with best play from both sides
+        """
+        return self.lookup(board)[0]
+
+    def close(self) -> None:
+        """
+        Releases the memory map
+        """
+        for view in self._views:
+            view.release()
+        self._map.close()
+
+    def __enter__(self) -> 'Tablebase':
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+
+    def _find(self, key: int) -> int:
+        """
+        Returns the slot holding key, or None if it isn't in the table
+        """
+        keys = self._keys
+        mask = len(keys) - 1
+        stored = key + 1
+        slot = Tablebase._slot(key, self._bits)
+        while True:
+            found = keys[slot]
+            if found == stored:
+                return slot
+            if found == 0:
+                return None
+            slot = (slot + 1) & mask
+
+    @staticmethod
+    def _slot(key: int, bits: int) -> int:
+        """
+        Fibonacci hashing, the top bits of key times 2^64 / golden ratio
+        """
+        return ((key * 0x9e3779b97f4a7c15) & 0xffffffffffffffff) >> (64 - bits)
+
+    @staticmethod
+    def _byte_order() -> int:
+        """
+        Byte order flag stored in the header
+        """
+        return 0 if sys.byteorder == 'little' else 1
+
+    @staticmethod
+    def build(filename: str, starting_player: TileState = TileState.X,
+              width: int = 3, height: int = 3, win_length: int = 3) -> None:
+        """
+        Generates the game graph, solves it once with a transposition
+        table so every position is solved once, and writes the tablebase.
+        Every non leaf position gets its SolveStep streamed in as the
+        solver goes, which is where the best moves come from
+        """
+        if width * height > Tablebase.max_tiles:
+            raise TicTacToeException(
+                'boards with more than {} tiles are not supported'.format(
+                    Tablebase.max_tiles))
+        generator = Generator(starting_player, width, height, win_length)
+        graph = generator.generate_graph()
+        positions = generator.positions
+        chosen: Dict[int, Tuple[int, int]] = {}
+
+        def keep(step: SolveStep) -> None:
+            chosen[step.parent.index] = (step.value, step.selected.index)
+
+        start_type = SolveType.MAX
+        if starting_player == TileState.O:
+            start_type = SolveType.MIN
+        Solver(TranspositionTable()).solve(graph.root, start_type,
+                                           on_step=keep)
+        bits = 3
+        while 1 << bits < 2 * len(positions):
+            bits += 1
+        slots = 1 << bits
+        keys = array('Q', bytes(8 * slots))
+        values = array('b', bytes(slots))
+        moves = array('b', [-1]) * slots
+        canonical = {node: key for key, node in positions.items()}
+        board = TicTacToeBoard(width, height, win_length)
+        for key, node in positions.items():
+            if graph.is_leaf(node):
+                value, tile = graph.value(node), -1
+            else:
+                value, best = chosen[node]
+                tile = Tablebase._move(board, key, canonical[best],
+                                       starting_player)
+            slot = Tablebase._slot(key, bits)
+            while keys[slot] != 0:
+                slot = (slot + 1) & (slots - 1)
+            keys[slot] = key + 1
+            values[slot] = value
+            moves[slot] = tile
+        with open(filename, 'wb') as file:
+            file.write(Tablebase.header.pack(
+                Tablebase.magic, Tablebase.version, Tablebase._byte_order(),
+                starting_player.value, width, height, win_length, bits,
+                len(positions)))
+            for data in (keys, values, moves):
+                data.tofile(file)
+
+    @staticmethod
+    def _move(board: TicTacToeBoard, key: int, child_key: int,
+              starting_player: TileState) -> int:
+        """
+        Finds the tile that turns the board with canonical key 'key'
+        into a board with canonical key 'child_key'.
+        The board is left empty afterwards
+        """
+        width = board.width
+        cells = width * board.height
+        placed = Tablebase._place(board, key, cells)
+        player = starting_player
+        if placed % 2 == 1:
+            player = TileState(-starting_player.value)
+        tile = -1
+        for row, column in board.empty_tiles():
+            board.set(row, column, player)
+            found = board.canonical_key() == child_key
+            board.set(row, column, TileState.EMPTY)
+            if found:
+                tile = row * width + column
+                break
+        for i in range(cells):
+            board.set(i // width, i % width, TileState.EMPTY)
+        return tile
+
+    @staticmethod
+    def _place(board: TicTacToeBoard, key: int, cells: int) -> int:
+        """
+        Sets the board to a key and returns how many tiles are taken
+        """
+        width = board.width
+        placed = 0
+        for i in range(cells):
+            if key >> i & 1:
+                board.set(i // width, i % width, TileState.X)
+                placed += 1
+            elif key >> (i + cells) & 1:
+                board.set(i // width, i % width, TileState.O)
+                placed += 1
+        return placed
+
+
+def play(moves: str, starting_player: TileState, width: int, height: int,
+         win_length: int) -> TicTacToeBoard:
+    """
+    Plays moves written like the labels from Generator, such as b2a1,
+    on an empty board
+    """
+    board = TicTacToeBoard(width, height, win_length)
+    player = starting_player
+    if re.fullmatch(r'([a-z][0-9]+)*', moves) is None:
+        raise TicTacToeException('can not read moves {}'.format(moves))
+    for column, row in re.findall(r'([a-z])([0-9]+)', moves):
+        row = int(row) - 1
+        column = ascii_lowercase.index(column)
+        if not 0 <= row < height or column >= width or \
+                board.get(row, column) != TileState.EMPTY:
+            raise TicTacToeException('can not play {}{}'.format(
+                ascii_lowercase[column], row + 1))
+        board.set(row, column, player)
+        player = TileState(-player.value)
+    return board
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Builds a tic tac toe tablebase, or looks up the best '
+                    'move for a position in one'
+    )
+    parser.add_argument('filename', help='Tablebase file')
+    parser.add_argument(
+        'moves',
+        nargs='?',
+        help='Moves played so far, like b2a1. Default is the empty board',
+        default='')
+    parser.add_argument(
+        '-b',
+        '--build',
+        help='Solves every position and writes the tablebase, instead of '
+             'looking a position up. Default is false',
+        action='store_true',
+        default=False)
+    parser.add_argument(
+        '-W',
+        '--width',
+        help='With --build, number of columns on the board. Default is 3',
+        type=int,
+        default=3)
+    parser.add_argument(
+        '-H',
+        '--height',
+        help='With --build, number of rows on the board. Default is 3',
+        type=int,
+        default=3)
+    parser.add_argument(
+        '-k',
+        '--win-length',
+        help='With --build, number in a row needed to win. Default is 3',
+        type=int,
+        default=3)
+    args = parser.parse_args()
+    if args.build:
+        Tablebase.build(args.filename, TileState.X, args.width,
+                        args.height, args.win_length)
+    else:
+        with Tablebase(args.filename) as table:
+            board = play(args.moves, table.starting_player, table.width,
+                         table.height, table.win_length)
+            value, move = table.lookup(board)
+            if move is None:
+                print('game is over, value is {}'.format(value))
+            else:
+                print('best move is {}{}, value is {}'.format(
+                    ascii_lowercase[move[1]], move[0] + 1, value))
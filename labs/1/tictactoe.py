@@ -1,5 +1,8 @@
+from node import Node
+from space import SearchSpace
 from enum import Enum
-from typing import List, Tuple
+from typing import Callable, Dict, List, Tuple
+from string import ascii_lowercase
 
 
 class TileState(Enum):
@@ -8,211 +11,436 @@ class TileState(Enum):
     EMPTY = 0
 
 
+class TicTacToeException(Exception):
+    def __init__(self, *args: object) -> None:
+        super().__init__(*args)
+
+
+class _Shape:
+    """
+    Precomputed tables for one board size and win length, shared by
+    every board of that shape.
+    A board is packed into one integer key, with bit (row * width + column)
+    set for every X, and the same bit shifted up by width * height for every O
+    """
+
+    def __init__(self, width: int, height: int, win_length: int) -> None:
+        self.width = width
+        self.height = height
+        self.win_length = win_length
+        self.cells = width * height
+        self.full = (1 << self.cells) - 1
+        self.lines = self._line_masks()
+        w = width - 1
+        h = height - 1
+        self.transforms: Dict[str, List[List[int]]] = {
+            'x_flip': self._permutation_table(lambda r, c: (h - r, c)),
+            'y_flip': self._permutation_table(lambda r, c: (r, w - c)),
+            'ccw_180': self._permutation_table(lambda r, c: (h - r, w - c)),
+        }
+        if width == height:
+            self.transforms['ccw_90'] = self._permutation_table(
+                lambda r, c: (c, w - r))
+            self.transforms['ccw_270'] = self._permutation_table(
+                lambda r, c: (w - c, r))
+            self.transforms['transpose'] = self._permutation_table(
+                lambda r, c: (c, r))
+            self.transforms['anti_transpose'] = self._permutation_table(
+                lambda r, c: (w - c, w - r))
+        # Together with the identity, these are all the rotations and
+        # reflections that map the board onto itself.
+        # Square boards have 8 of them, other boards only have 4
+        self.symmetries = list(self.transforms.values())
+        # Where every tile ends up under each symmetry
+        self.tile_moves = [[self.transform(1 << i, tables).bit_length() - 1
+                            for i in range(self.cells)]
+                           for tables in self.symmetries]
+        self.identity = list(range(self.cells))
+
+    def _line_masks(self) -> List[int]:
+        """
+        Bit masks of every horizontal, vertical and diagonal line
+        of win_length tiles
+        """
+        lines = []
+        k = self.win_length
+        for row in range(self.height):
+            for column in range(self.width):
+                for d_row, d_column in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                    end_row = row + d_row * (k - 1)
+                    end_column = column + d_column * (k - 1)
+                    if end_row >= self.height or not 0 <= end_column < self.width:
+                        continue
+                    lines.append(sum(
+                        1 << ((row + d_row * i) * self.width + column + d_column * i)
+                        for i in range(k)))
+        return lines
+
+    def _permutation_table(
+            self, source: Callable[[int, int], Tuple[int, int]]) -> List[List[int]]:
+        """
+        Precomputes a symmetry for every possible key, a byte at a time.
+        source maps a (row, column) of the new board to the (row, column)
+        of the old board it is copied from.
+        Entry [i][bits] is where the bits of byte i of an old key end up
+        in the new key
+        """
+        moves = {}
+        for row in range(self.height):
+            for column in range(self.width):
+                old_row, old_column = source(row, column)
+                old = old_row * self.width + old_column
+                new = row * self.width + column
+                moves[old] = new
+                moves[old + self.cells] = new + self.cells
+        tables = []
+        for start in range(0, 2 * self.cells, 8):
+            table = []
+            for bits in range(256):
+                moved = 0
+                for i in range(8):
+                    if bits >> i & 1 and start + i in moves:
+                        moved |= 1 << moves[start + i]
+                table.append(moved)
+            tables.append(table)
+        return tables
+
+    def transform(self, key: int, tables: List[List[int]]) -> int:
+        """
+        Applies a precomputed symmetry to a key
+        """
+        moved = 0
+        for table in tables:
+            moved |= table[key & 0xff]
+            key >>= 8
+        return moved
+
+    def canonical(self, key: int) -> int:
+        """
+        Returns the smallest key among the symmetries of a key
+        """
+        best = key
+        for tables in self.symmetries:
+            moved = 0
+            shifted = key
+            for table in tables:
+                moved |= table[shifted & 0xff]
+                shifted >>= 8
+            if moved < best:
+                best = moved
+        return best
+
+    def orientation(self, key: int) -> Tuple[int, List[int]]:
+        """
+        Returns the canonical key of a key, and where every tile of the
+        key ends up on the canonical board
+        """
+        best = key
+        moves = self.identity
+        for tables, tile_moves in zip(self.symmetries, self.tile_moves):
+            moved = self.transform(key, tables)
+            if moved < best:
+                best = moved
+                moves = tile_moves
+        return best, moves
+
+
 class TicTacToeBoard:
-    def __init__(self) -> None:
-        self._board = [[TileState.EMPTY for _ in range(3)] for _ in range(3)]
+    """
+    TicTacToeBoard is a bitboard for a width x height board, where
+    a player wins by getting win_length in a row.
+    Bit (row * width + column) of one integer is set for every X,
+    and the same bit of a second integer for every O.
+    Wins are checked against precomputed masks of every line, and the
+    symmetries look the new bits up in precomputed permutation tables
+    """
+
+    _shapes: Dict[Tuple[int, int, int], _Shape] = {}
+
+    def __init__(self, width: int = 3, height: int = 3,
+                 win_length: int = 3) -> None:
+        if width < 1 or height < 1:
+            raise TicTacToeException('board must have at least one tile')
+        if win_length < 1 or win_length > max(width, height):
+            raise TicTacToeException(
+                'win length {} does not fit on a {}x{} board'.format(
+                    win_length, width, height))
+        shape = self._shapes.get((width, height, win_length))
+        if shape is None:
+            shape = _Shape(width, height, win_length)
+            self._shapes[(width, height, win_length)] = shape
+        self._shape = shape
+        self._x = 0
+        self._o = 0
+
+    @property
+    def width(self) -> int:
+        return self._shape.width
+
+    @property
+    def height(self) -> int:
+        return self._shape.height
+
+    @property
+    def win_length(self) -> int:
+        return self._shape.win_length
 
     def set(self, row: int, column: int, state: TileState) -> None:
         """
         Sets the square at (row, column) to 'state'
         """
-        self._board[row][column] = state
+        bit = 1 << (row * self._shape.width + column)
+        if state == TileState.X:
+            self._x |= bit
+            self._o &= ~bit
+        elif state == TileState.O:
+            self._o |= bit
+            self._x &= ~bit
+        else:
+            self._x &= ~bit
+            self._o &= ~bit
+
+    def get(self, row: int, column: int) -> TileState:
+        """
+        Gets the state of the square at (row, column)
+        """
+        bit = 1 << (row * self._shape.width + column)
+        if self._x & bit:
+            return TileState.X
+        if self._o & bit:
+            return TileState.O
+        return TileState.EMPTY
 
     def empty_tiles(self) -> List[Tuple[int, int]]:
         """
         Gets all of the empty tiles in the board.
         Returns a tuple of [row num, column num]
         """
-        empty_tiles = []
-        for row in range(3):
-            for column in range(3):
-                if self._board[row][column] == TileState.EMPTY:
-                    empty_tiles.append([row, column])
-        return empty_tiles
+        shape = self._shape
+        empty = ~(self._x | self._o) & shape.full
+        width = shape.width
+        return [[i // width, i % width] for i in range(shape.cells)
+                if empty >> i & 1]
 
     def check_win(self, player: TileState) -> bool:
         """
-        Checks whether or not 'player' has won by attaining 3 in a row
+        Checks whether or not 'player' has won by attaining
+        win_length in a row
         """
-        for i in range(3):
-            # Check row
-            if self._check_list(self._board[i], player):
-                return True
-            # Check column
-            if self._check_column(i, player):
+        bits = self._bits(player)
+        for line in self._shape.lines:
+            if bits & line == line:
                 return True
-        diagonal = [self._board[row][column]
-                    for row in range(3) for column in range(3)]
-        if self._check_list(diagonal, player):
-            return True
-        diagonal = [self._board[row][column]
-                    for row in range(3) for column in range(2, -1, -1)]
-        if self._check_list(diagonal, player):
-            return True
         return False
 
-    def _check_list(self, data: List[TileState], player: TileState) -> bool:
-        """
-        CHeck that all values in the list is equal to 'player'
-        """
-        return len([x for x in data if x == player]) == len(data)
-
-    def _check_column(self, column: int, player: TileState) -> bool:
-        """
-        Check that all values in a column is equivalent to 'player'
-        """
-        return self._check_list(self._get_column(column), player)
-
-    def _copy(self) -> 'TicTacToeBoard':
+    def key(self) -> int:
         """
-        Returns a copy of the board
+        Packs the board into one integer, X in the low bits and O above them
         """
-        new_board = TicTacToeBoard()
-        for row in range(3):
-            for column in range(3):
-                new_board._board[row][column] = self._board[row][column]
-        return new_board
+        return self._x | (self._o << self._shape.cells)
 
-    def _set_row(self, row_num: int, row: List[TileState]) -> None:
+    def canonical_key(self) -> int:
         """
-        Sets row at 'row_num' to 'row'
+        Returns the smallest key among the rotations and reflections
+        of the board, so every symmetric board has the same canonical key
         """
-        self._board[row_num] = row
+        return self._shape.canonical(self._x | (self._o << self._shape.cells))
 
-    def _get_row(self, row_num: int) -> List[TileState]:
+    def orientation(self) -> Tuple[int, List[int]]:
         """
-        Returns a copy of the row at 'row_num'
+        Returns the canonical key, and a list of where every tile
+        (row * width + column) ends up on the canonical board
         """
-        return self._board[row_num].copy()
+        return self._shape.orientation(self.key())
 
-    def _set_column(self, column_num: int,
-                    column: List[TileState]) -> None:
+    def _bits(self, player: TileState) -> int:
         """
-        Sets the values of the column at 'column_num'
-        to 'column'
+        Returns the bits of the tiles that are set to 'player'
         """
-        for i in range(3):
-            self._board[i][column_num] = column[i]
+        if player == TileState.X:
+            return self._x
+        if player == TileState.O:
+            return self._o
+        return ~(self._x | self._o) & self._shape.full
 
-    def _get_column(self, column_num: int) -> List[TileState]:
-        """
-        Returns the column at 'column_num'
-        """
-        return [self._board[x][column_num] for x in range(3)]
+    def _transform(self, name: str) -> 'TicTacToeBoard':
+        """
+        Returns a copy of the board with a symmetry applied
+        """
+        shape = self._shape
+        tables = shape.transforms.get(name)
+        if tables is None:
+            raise TicTacToeException(
+                'a {}x{} board can not be rotated by 90 degrees'.format(
+                    shape.width, shape.height))
+        key = shape.transform(self.key(), tables)
+        new_board = TicTacToeBoard(shape.width, shape.height, shape.win_length)
+        new_board._x = key & shape.full
+        new_board._o = key >> shape.cells
+        return new_board
 
     def x_flip(self) -> 'TicTacToeBoard':
         """
         Create a copy of the current board, and flip along the x-axis
-        This is done by swapping the following (row, column) pairs:
-        (0,0) <-> (2,0)
-        (0,1) <-> (2,1)
-        (0,2) <-> (2,2)
-        """
-        new_board = self._copy()
-        new_board._board[0][0], new_board._board[2][0] = new_board._board[2][0], new_board._board[0][0]
-        new_board._board[0][1], new_board._board[2][1] = new_board._board[2][1], new_board._board[0][1]
-        new_board._board[0][2], new_board._board[2][2] = new_board._board[2][2], new_board._board[0][2]
-        return new_board
+        This swaps the top and bottom rows
+        """
+        return self._transform('x_flip')
 
     def y_flip(self) -> 'TicTacToeBoard':
         """
         Create a copy of the current board, and flip along the y-axis
-        This is done by swapping the following (row, column) pairs:
-        (0,0) <-> (0,2)
-        (1,0) <-> (1,2)
-        (2,0) <-> (2,2)
-        """
-        new_board = self._copy()
-        new_board._board[0][0], new_board._board[0][2] = new_board._board[0][2], new_board._board[0][0]
-        new_board._board[1][0], new_board._board[1][2] = new_board._board[1][2], new_board._board[1][0]
-        new_board._board[2][0], new_board._board[2][2] = new_board._board[2][2], new_board._board[2][0]
-        return new_board
+        This swaps the left and right columns
+        """
+        return self._transform('y_flip')
 
     def rotate_ccw_90(self) -> 'TicTacToeBoard':
         """
         Returns a copy of the board, but rotated ccw 90
+        Only square boards can be rotated by 90 degrees
         """
-        new_board = self._copy()
-        new_board._rotate_ccw_90()
-        return new_board
-
-    def _rotate_ccw_90(self) -> None:
-        """
-        Rotates self ccw 90
-        """
-        left_column = self._get_column(0)
-        bottom_row = self._get_row(2)
-        right_column = self._get_column(2)
-        top_row = self._get_row(0)
-        self._set_row(2, left_column)
-        bottom_row.reverse()
-        self._set_column(2, bottom_row)
-        self._set_row(0, right_column)
-        top_row.reverse()
-        self._set_column(0, top_row)
+        return self._transform('ccw_90')
 
     def rotate_ccw_180(self) -> 'TicTacToeBoard':
         """
         Returns a copy of the board, but rotated ccw 180
         """
-        new_board = self.rotate_ccw_90()
-        new_board._rotate_ccw_90()
-        return new_board
+        return self._transform('ccw_180')
 
     def rotate_ccw_270(self) -> 'TicTacToeBoard':
         """
         Returns a copy of the board, but rotated ccw 270
+        Only square boards can be rotated by 90 degrees
         """
-        new_board = self.rotate_ccw_180()
-        new_board._rotate_ccw_90()
-        return new_board
+        return self._transform('ccw_270')
 
     def rotate_cw_90(self) -> 'TicTacToeBoard':
         """
         Returns a copy of the board, but rotated cw 90
+        Only square boards can be rotated by 90 degrees
         """
-        new_board = self._copy()
-        new_board._rotate_cw_90()
-        return new_board
-
-    def _rotate_cw_90(self) -> None:
-        """
-        Rotates self cw 90
-        """
-        left_column = self._get_column(0)
-        bottom_row = self._get_row(2)
-        right_column = self._get_column(2)
-        top_row = self._get_row(0)
-        left_column.reverse()
-        self._set_row(0, left_column)
-        self._set_column(2, top_row)
-        right_column.reverse()
-        self._set_row(2, right_column)
-        self._set_column(0, bottom_row)
+        return self._transform('ccw_270')
 
     def rotate_cw_180(self) -> 'TicTacToeBoard':
         """
         Returns a copy of the board, but rotated cw 180
         """
-        new_board = self.rotate_cw_90()
-        new_board._rotate_cw_90()
-        return new_board
+        return self._transform('ccw_180')
 
     def rotate_cw_270(self) -> 'TicTacToeBoard':
         """
         Returns a copy of the board, but rotated cw 270
+        Only square boards can be rotated by 90 degrees
         """
-        new_board = self.rotate_cw_180()
-        new_board._rotate_cw_90()
-        return new_board
+        return self._transform('ccw_90')
 
     def hash(self) -> str:
         """
         Generates a string representation of the board
         """
-        flattened = [*self._board[0], *self._board[1], *self._board[2]]
-        flattened_str = [str(x) for x in flattened]
-        return ';'.join(flattened_str)
+        width = self._shape.width
+        return ';'.join([str(self.get(i // width, i % width))
+                         for i in range(self._shape.cells)])
+
+
+class TicTacToeSpace(SearchSpace):
+    """
+    TicTacToeSpace lets the solver search tic tac toe positions directly,
+    without generating and writing out the graph first.
+    States are (board key, label, canonical key) tuples.
+    The label is the moves made so far, like the labels from Generator.
+    Symmetric positions share a transposition table entry, since the
+    canonical key is the table key, and symmetric moves from the same
+    position are only searched once
+    """
+
+    def __init__(self, starting_player: TileState = TileState.X,
+                 width: int = 3, height: int = 3, win_length: int = 3) -> None:
+        if starting_player == TileState.EMPTY:
+            raise TicTacToeException('starting player must be X or O')
+        if width > len(ascii_lowercase):
+            raise TicTacToeException(
+                'boards wider than {} columns are not supported'.format(
+                    len(ascii_lowercase)))
+        self._shape = TicTacToeBoard(width, height, win_length)._shape
+        self._starting_player = starting_player
+        self._min_level = 2 * win_length - 1
+        self._notation = [ascii_lowercase[i % width] + str(i // width + 1)
+                          for i in range(self._shape.cells)]
+
+    @property
+    def root(self) -> Tuple[int, str, int]:
+        """
+        The state for the empty board
+        """
+        return (0, '', 0)
+
+    def is_leaf(self, state: Tuple[int, str, int]) -> bool:
+        key = state[0]
+        shape = self._shape
+        if (key | (key >> shape.cells)) & shape.full == shape.full:
+            return True
+        return self._winner(key) != TileState.EMPTY
+
+    def value(self, state: Tuple[int, str, int]) -> int:
+        return self._winner(state[0]).value
+
+    def children(self, state: Tuple[int, str, int]) -> List[Tuple[int, str, int]]:
+        key, label = state[0], state[1]
+        shape = self._shape
+        cells = shape.cells
+        x = key & shape.full
+        o = key >> cells
+        moves = bin(x).count('1') + bin(o).count('1')
+        offset = 0 if self._mover(moves) == TileState.X else cells
+        empty = ~(x | o) & shape.full
+        children = []
+        seen = set()
+        for i in range(cells):
+            if empty >> i & 1:
+                child = key | (1 << (i + offset))
+                canonical = shape.canonical(child)
+                if canonical in seen:
+                    continue
+                seen.add(canonical)
+                children.append((child, label + self._notation[i], canonical))
+        return children
+
+    def node(self, state: Tuple[int, str, int]) -> Node:
+        label = state[1] if state[1] != '' else 'root'
+        if self.is_leaf(state):
+            return Node(label, self.value(state))
+        return Node(label)
+
+    def key(self, state: Tuple[int, str, int]) -> int:
+        return state[2]
+
+    def _mover(self, moves: int) -> TileState:
+        """
+        Player whose turn it is after 'moves' moves
+        """
+        if moves % 2 == 0:
+            return self._starting_player
+        if self._starting_player == TileState.X:
+            return TileState.O
+        return TileState.X
+
+    def _winner(self, key: int) -> TileState:
+        """
+        Returns the player with win_length in a row, or EMPTY
+        Only the player who moved last can have just won
+        """
+        shape = self._shape
+        x = key & shape.full
+        o = key >> shape.cells
+        moves = bin(x).count('1') + bin(o).count('1')
+        if moves < self._min_level:
+            return TileState.EMPTY
+        player = self._mover(moves - 1)
+        bits = x if player == TileState.X else o
+        for line in shape.lines:
+            if bits & line == line:
+                return player
+        return TileState.EMPTY
 
 
 if __name__ == '__main__':
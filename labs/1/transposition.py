@@ -0,0 +1,101 @@
+from enum import Enum
+from typing import Dict, Hashable, Tuple
+
+
+class Bound(Enum):
+    EXACT = 0
+    LOWER = 1
+    UPPER = 2
+
+
+class TableEntry:
+    """
+    TableEntry is a single cached search result.
+    For EXACT entries, value is the minimax value of the node.
+    For LOWER entries, the real value is at least value,
+    and for UPPER entries the real value is at most value.
+    depth is how many plies below the node were searched, or None if
+    the search went all the way down to the leaves
+    """
+
+    def __init__(self, value: int, bound: Bound, best: Hashable,
+                 depth: int = None) -> None:
+        self._value = value
+        self._bound = bound
+        self._best = best
+        self._depth = depth
+
+    @property
+    def value(self) -> int:
+        return self._value
+
+    @property
+    def bound(self) -> Bound:
+        return self._bound
+
+    @property
+    def best(self) -> Hashable:
+        return self._best
+
+    @property
+    def depth(self) -> int:
+        return self._depth
+
+
+class TranspositionTable:
+    """
+    TranspositionTable caches search results so that a node reached
+    through several parents is only searched once.
+    Entries are keyed by node identity and side-to-move, since the same
+    node can be a min node down one path and a max node down another
+    """
+
+    def __init__(self) -> None:
+        self._entries: Dict[Tuple[Hashable, 'SolveType'], TableEntry] = {}
+        self._hits = 0
+        self._misses = 0
+
+    def probe(self, node: Hashable, select_type: 'SolveType',
+              depth: int = None) -> TableEntry:
+        """
+        Returns the entry for the node, or None if it hasn't been stored.
+        A depth limited search passes how many plies it still needs,
+        and entries from shallower searches are treated as missing
+        """
+        entry = self._entries.get((node, select_type))
+        if entry is not None and entry.depth is not None and (
+                depth is None or entry.depth < depth):
+            entry = None
+        if entry is None:
+            self._misses += 1
+        else:
+            self._hits += 1
+        return entry
+
+    def store(self, node: Hashable, select_type: 'SolveType',
+              value: int, bound: Bound, best: Hashable = None,
+              depth: int = None) -> None:
+        """
+        Stores a search result for the node, replacing any older entry
+        """
+        self._entries[(node, select_type)] = TableEntry(
+            value, bound, best, depth)
+
+    def clear(self) -> None:
+        """
+        Drops all entries and resets the counters
+        """
+        self._entries.clear()
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def hits(self) -> int:
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        return self._misses
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,94 @@
+from graph import Graph
+from solver import SolveType
+import numpy as np
+
+
+class BottomUp:
+    """
+    BottomUp computes the minimax value of every node in a Graph at once,
+    with NumPy instead of a Python loop per node.
+    A node can be reached as a max node down one path and as a min node
+    down another, so both values are computed for every node.
+    Nodes are grouped into levels by height, leaves first, so every node's
+    children are in lower levels. Each level is then one gather of its
+    children's values and one segmented max and min (reduceat) over them.
+    Ties go to the first child, same as Solver._minimax
+    """
+
+    def __init__(self, graph: Graph) -> None:
+        offsets = np.asarray(graph.child_offsets).astype(np.int64)
+        children = np.asarray(graph.child_ids).astype(np.int64)
+        counts = np.diff(offsets)
+        self._levels = self._heights(children, counts)
+        values = np.asarray(graph.values).astype(np.int64)
+        max_values = values.copy()
+        min_values = values.copy()
+        max_chosen = np.full(len(values), -1, dtype=np.int64)
+        min_chosen = np.full(len(values), -1, dtype=np.int64)
+        for level in self._levels[1:]:
+            lengths = counts[level]
+            kids = children[self._ranges(offsets[level], lengths)]
+            starts = np.cumsum(lengths) - lengths
+            positions = np.arange(len(kids))
+            # A max node picks among its children as min nodes,
+            # and a min node among its children as max nodes
+            for chosen, kid_values, reduce, results in (
+                    (max_chosen, min_values[kids], np.maximum, max_values),
+                    (min_chosen, max_values[kids], np.minimum, min_values)):
+                best = reduce.reduceat(kid_values, starts)
+                first = np.minimum.reduceat(np.where(
+                    kid_values == np.repeat(best, lengths),
+                    positions, len(kids)), starts)
+                results[level] = best
+                chosen[level] = kids[first]
+        self._values = {SolveType.MAX: max_values, SolveType.MIN: min_values}
+        self._chosen = {SolveType.MAX: max_chosen, SolveType.MIN: min_chosen}
+
+    @property
+    def levels(self) -> list:
+        """
+        Node ids of every level, starting with the leaves
+        """
+        return self._levels
+
+    def value(self, node: int, select_type: SolveType) -> int:
+        return int(self._values[select_type][node])
+
+    def chosen(self, node: int, select_type: SolveType) -> int:
+        """
+        The child a non leaf node picks
+        """
+        return int(self._chosen[select_type][node])
+
+    def _heights(self, children: np.ndarray, counts: np.ndarray) -> list:
+        """
+        Groups nodes by height with Kahn's algorithm run from the leaves up.
+        A node joins a level once all of its children are in lower levels
+        """
+        size = len(counts)
+        parents = np.repeat(np.arange(size), counts)
+        by_child = np.argsort(children, kind='stable')
+        edge_parents = parents[by_child]
+        parent_offsets = np.zeros(size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(children, minlength=size),
+                  out=parent_offsets[1:])
+        waiting = counts.copy()
+        level = np.flatnonzero(counts == 0)
+        levels = []
+        while len(level) > 0:
+            levels.append(level)
+            starts = parent_offsets[level]
+            found = edge_parents[self._ranges(
+                starts, parent_offsets[level + 1] - starts)]
+            found, times = np.unique(found, return_counts=True)
+            waiting[found] -= times
+            level = found[waiting[found] == 0]
+        return levels
+
+    def _ranges(self, starts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+        """
+        Concatenates range(start, start + length) for every pair
+        """
+        ends = np.cumsum(lengths)
+        return np.arange(ends[-1] if len(ends) else 0) - \
+            np.repeat(ends - lengths - starts, lengths)
@@ -0,0 +1,81 @@
+from typing import Dict, Iterable, List
+from literal import Literal
+from array import array
+
+
+class ClauseDatabase():
+    """
+    Keeps every clause once, as integers in one flat array.
+    Atoms are numbered in the order they are first seen, and literals are
+    2 * atom, plus 1 if negated, so lit ^ 1 is the negation of lit.
+    Clause i is literals[starts[i]:starts[i + 1]]
+    """
+
+    def __init__(self) -> None:
+        self._atoms: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self._literals = array('i')
+        self._starts = array('i', [0])
+
+    @staticmethod
+    def from_sentences(sentences: List[List[Literal]]) -> 'ClauseDatabase':
+        """
+        Builds the database from the sentences SolverParser returns
+        """
+        clauses = ClauseDatabase()
+        for sentence in sentences:
+            clauses.add_clause(clauses.literal(x.atom, x.negation)
+                               for x in sentence)
+        return clauses
+
+    def atom_id(self, atom: str) -> int:
+        """
+        Returns the number of an atom, giving it one if it is new
+        """
+        id = self._ids.get(atom)
+        if id is None:
+            id = len(self._atoms)
+            self._ids[atom] = id
+            self._atoms.append(atom)
+        return id
+
+    def literal(self, atom: str, negation: bool = False) -> int:
+        return 2 * self.atom_id(atom) + (1 if negation else 0)
+
+    def add_clause(self, literals: Iterable[int]) -> int:
+        """
+        Adds a clause and returns its index.
+        Repeated literals are kept, so a clause like a a isn't a unit,
+        same as in the original solver
+        """
+        self._literals.extend(literals)
+        self._starts.append(len(self._literals))
+        return len(self._starts) - 2
+
+    def truncate(self, count: int) -> None:
+        """
+        Drops every clause after the first count
+        """
+        del self._literals[self._starts[count]:]
+        del self._starts[count + 1:]
+
+    def clause(self, index: int) -> array:
+        return self._literals[self._starts[index]:self._starts[index + 1]]
+
+    @property
+    def atoms(self) -> List[str]:
+        """
+        Atom names, indexed by atom number
+        """
+        return self._atoms
+
+    @property
+    def literals(self) -> array:
+        return self._literals
+
+    @property
+    def starts(self) -> array:
+        return self._starts
+
+    def __len__(self) -> int:
+        return len(self._starts) - 1
@@ -2,8 +2,11 @@ from typing import List
 from propositional_ast import NegateOperator, PropositionalAST, BinaryOperator, BinaryPropositionalOperator, Atom
 from propositional_parser import Parser
 from literal import Literal
+from clauses import ClauseDatabase
+from dimacs import DimacsParser, DimacsException
 from itertools import chain
 import argparse
+import sys
 
 
 class ConvertException(Exception):
@@ -59,10 +62,43 @@ if __name__ == '__main__':
         description='Converts propositional logic to a CNF file'
     )
     parser.add_argument('filename', help='Propositional logic input file')
+    parser.add_argument(
+        '-i',
+        '--input',
+        help='Format of the input, propositional logic, or DIMACS CNF '
+             'to convert to another CNF format. Default is logic',
+        choices=['logic', 'dimacs'],
+        default='logic')
+    parser.add_argument(
+        '-o',
+        '--output',
+        help='Format of the output, the CNF format solver.py reads, or '
+             'DIMACS CNF. Default is cnf',
+        choices=['cnf', 'dimacs'],
+        default='cnf')
     args = parser.parse_args()
     file = args.filename
-    parser = Parser(file)
-    root = Root(parser.parse())
-    result = root.to_literals()
-    for sentence in result:
-        print(' '.join(str(x) for x in sentence))
+    if args.input == 'dimacs':
+        try:
+            clauses = DimacsParser.parse(file)
+        except DimacsException as e:
+            parser.error(str(e))
+    else:
+        root = Root(Parser(file).parse())
+        result = root.to_literals()
+        if args.output == 'cnf':
+            for sentence in result:
+                print(' '.join(str(x) for x in sentence))
+            exit()
+        clauses = ClauseDatabase.from_sentences(result)
+    if args.output == 'dimacs':
+        DimacsParser.write(clauses, sys.stdout)
+        exit()
+    atoms = clauses.atoms
+    for index in range(len(clauses)):
+        clause = clauses.clause(index)
+        if len(clause) == 0:
+            # Empty lines are skipped, so this can't be written
+            parser.error('clause {} is empty'.format(index + 1))
+        print(' '.join(('!' if x & 1 else '') + atoms[x >> 1]
+                       for x in clause))
@@ -0,0 +1,89 @@
+from typing import List, TextIO
+from clauses import ClauseDatabase
+
+
+class DimacsException(Exception):
+    def __init__(self, *args: object) -> None:
+        super().__init__(*args)
+
+
+class DimacsParser():
+    """
+    Reads and writes DIMACS CNF, the 'p cnf atoms clauses' header
+    followed by clauses of non zero integers, each ended by a 0.
+    Atom n is named 'n', and is atom n - 1 in the database, so literals
+    go straight into the database without looking atoms up
+    """
+
+    @staticmethod
+    def parse(file: str) -> ClauseDatabase:
+        """
+        Reads the file a line at a time, clauses can span lines
+        """
+        clauses = ClauseDatabase()
+        atoms = -1
+        clause: List[int] = []
+        with open(file, 'r') as input:
+            for line in input:
+                tokens = line.split()
+                if len(tokens) == 0 or tokens[0][0] == 'c':
+                    continue
+                if tokens[0] == 'p':
+                    if len(tokens) != 4 or tokens[1] != 'cnf' or atoms != -1:
+                        raise DimacsException(
+                            'bad header {}'.format(line.strip()))
+                    atoms = DimacsParser._number(tokens[2])
+                    if atoms < 0:
+                        raise DimacsException(
+                            'bad header {}'.format(line.strip()))
+                    for atom in range(1, atoms + 1):
+                        clauses.atom_id(str(atom))
+                    continue
+                # Some benchmark sets end with a line of %
+                if tokens[0] == '%':
+                    break
+                if atoms == -1:
+                    raise DimacsException('clauses before the p cnf header')
+                for token in tokens:
+                    value = DimacsParser._number(token)
+                    if value == 0:
+                        clauses.add_clause(clause)
+                        clause = []
+                        continue
+                    atom = abs(value)
+                    # Atoms past the header's count are allowed
+                    while atom > atoms:
+                        atoms += 1
+                        clauses.atom_id(str(atoms))
+                    clause.append(2 * atom - (2 if value > 0 else 1))
+        if atoms == -1:
+            raise DimacsException('missing p cnf header')
+        if len(clause) != 0:
+            clauses.add_clause(clause)
+        return clauses
+
+    @staticmethod
+    def write(clauses: ClauseDatabase, output: TextIO) -> None:
+        """
+        Writes a clause at a time. Atoms are numbered from 1 in the
+        database's order, and unless atoms are already named by their
+        number, comments at the top map every number to its atom
+        """
+        atoms = clauses.atoms
+        if any(atom != str(x + 1) for x, atom in enumerate(atoms)):
+            for x, atom in enumerate(atoms):
+                output.write('c {} {}\n'.format(x + 1, atom))
+        output.write('p cnf {} {}\n'.format(len(atoms), len(clauses)))
+        literals = clauses.literals
+        starts = clauses.starts
+        for index in range(len(clauses)):
+            output.write(''.join(
+                '{} '.format(-(x >> 1) - 1 if x & 1 else (x >> 1) + 1)
+                for x in literals[starts[index]:starts[index + 1]]) + '0\n')
+
+    @staticmethod
+    def _number(token: str) -> int:
+        try:
+            return int(token)
+        except ValueError:
+            raise DimacsException('{} is not a number'.format(token))
@@ -0,0 +1,200 @@
+from typing import Dict, List, Type
+from clauses import ClauseDatabase
+from itertools import chain
+
+
+class Heuristic():
+    """
+    Decides which literal the solver guesses next.
+    values is the solver's list of literal values, 1 for true, -1 for false
+    and 0 for unassigned, which the solver keeps up to date
+    """
+
+    def __init__(self, clauses: ClauseDatabase, values: List[int]) -> None:
+        self._clauses = clauses
+        self._values = values
+
+    def decide(self) -> int:
+        """
+        Returns the literal to guess, or -1 if there is nothing left to guess
+        """
+        raise NotImplementedError()
+
+    def bump(self, atom: int) -> None:
+        """
+        Called for every atom involved in a conflict
+        """
+        pass
+
+    def decay(self) -> None:
+        """
+        Called once after every conflict
+        """
+        pass
+
+    def unassigned(self, literal: int) -> None:
+        """
+        Called for every literal the solver unassigns
+        """
+        pass
+
+
+class LexicographicHeuristic(Heuristic):
+    """
+    Guesses the lowest atom, by name, in a clause that isn't satisfied
+    yet, and guesses it True. Gives the same results as the original solver.
+    A cursor into the atoms sorted by name skips the assigned atoms at the
+    front, it only moves forward past assigned atoms, and moves back when
+    an atom before it is unassigned
+    """
+
+    def __init__(self, clauses: ClauseDatabase, values: List[int]) -> None:
+        super().__init__(clauses, values)
+        atoms = clauses.atoms
+        self._order = sorted(range(len(atoms)), key=lambda x: atoms[x])
+        self._rank = [0] * len(atoms)
+        for rank, atom in enumerate(self._order):
+            self._rank[atom] = rank
+        # Every atom in _order before _cursor is assigned
+        self._cursor = 0
+        # Clauses every literal is in
+        self._occurrences: List[List[int]] = [[] for _ in values]
+        literals = clauses.literals
+        starts = clauses.starts
+        for index in range(len(clauses)):
+            for position in range(starts[index], starts[index + 1]):
+                self._occurrences[literals[position]].append(index)
+
+    def decide(self) -> int:
+        literals = self._clauses.literals
+        starts = self._clauses.starts
+        values = self._values
+        occurrences = self._occurrences
+        order = self._order
+        while self._cursor < len(order) and \
+                values[2 * order[self._cursor]] != 0:
+            self._cursor += 1
+        for rank in range(self._cursor, len(order)):
+            atom = order[rank]
+            if values[2 * atom] != 0:
+                continue
+            for clause in chain(occurrences[2 * atom],
+                                occurrences[2 * atom + 1]):
+                for position in range(starts[clause], starts[clause + 1]):
+                    if values[literals[position]] == 1:
+                        break
+                else:
+                    return 2 * atom
+        return -1
+
+    def unassigned(self, literal: int) -> None:
+        rank = self._rank[literal >> 1]
+        if rank < self._cursor:
+            self._cursor = rank
+
+
+class VSIDSHeuristic(Heuristic):
+    """
+    Variable state independent decaying sum. Every atom has an activity,
+    which is bumped when it is involved in a conflict, and all activities
+    decay after every conflict, by bumping with a growing increment instead.
+    The most active unassigned atom is guessed, kept on top of a binary
+    heap. Atoms are guessed with the value they had last, which is True
+    for atoms that were never assigned
+    """
+
+    decay_factor = 0.95
+
+    def __init__(self, clauses: ClauseDatabase, values: List[int]) -> None:
+        super().__init__(clauses, values)
+        atoms = clauses.atoms
+        self._activities = [0.0] * len(atoms)
+        self._increment = 1.0
+        self._phases = [True] * len(atoms)
+        # Sorted by name, so atoms that were never bumped come in name order
+        self._heap = sorted(range(len(atoms)), key=lambda x: atoms[x])
+        # Position of every atom in the heap, -1 if it isn't in it
+        self._indices = [0] * len(atoms)
+        for index, atom in enumerate(self._heap):
+            self._indices[atom] = index
+
+    def decide(self) -> int:
+        values = self._values
+        while len(self._heap) > 0:
+            atom = self._pop()
+            if values[2 * atom] == 0:
+                return 2 * atom + (0 if self._phases[atom] else 1)
+        return -1
+
+    def bump(self, atom: int) -> None:
+        activities = self._activities
+        activities[atom] += self._increment
+        if activities[atom] > 1e100:
+            for index in range(len(activities)):
+                activities[index] *= 1e-100
+            self._increment *= 1e-100
+        if self._indices[atom] != -1:
+            self._up(self._indices[atom])
+
+    def decay(self) -> None:
+        self._increment /= self.decay_factor
+
+    def unassigned(self, literal: int) -> None:
+        atom = literal >> 1
+        self._phases[atom] = literal & 1 == 0
+        if self._indices[atom] == -1:
+            self._indices[atom] = len(self._heap)
+            self._heap.append(atom)
+            self._up(len(self._heap) - 1)
+
+    def _pop(self) -> int:
+        heap = self._heap
+        top = heap[0]
+        last = heap.pop()
+        self._indices[top] = -1
+        if len(heap) > 0:
+            heap[0] = last
+            self._indices[last] = 0
+            self._down(0)
+        return top
+
+    def _up(self, index: int) -> None:
+        heap = self._heap
+        indices = self._indices
+        activities = self._activities
+        atom = heap[index]
+        while index > 0:
+            parent = (index - 1) >> 1
+            if activities[heap[parent]] >= activities[atom]:
+                break
+            heap[index] = heap[parent]
+            indices[heap[index]] = index
+            index = parent
+        heap[index] = atom
+        indices[atom] = index
+
+    def _down(self, index: int) -> None:
+        heap = self._heap
+        indices = self._indices
+        activities = self._activities
+        atom = heap[index]
+        while True:
+            child = 2 * index + 1
+            if child >= len(heap):
+                break
+            if child + 1 < len(heap) and \
+                    activities[heap[child + 1]] > activities[heap[child]]:
+                child += 1
+            if activities[heap[child]] <= activities[atom]:
+                break
+            heap[index] = heap[child]
+            indices[heap[index]] = index
+            index = child
+        heap[index] = atom
+        indices[atom] = index
+
+
+heuristics: Dict[str, Type[Heuristic]] = {
+    'vsids': VSIDSHeuristic,
+    'lexicographic': LexicographicHeuristic,
+}
@@ -1,6 +1,8 @@
-from typing import List, Tuple
+from typing import List, Tuple, Type
 from literal import Literal
-from itertools import chain
+from clauses import ClauseDatabase
+from dimacs import DimacsParser, DimacsException
+from heuristics import Heuristic, VSIDSHeuristic, heuristics
 import argparse
 
 
@@ -20,89 +22,399 @@ class SolverParser():
 
 
 class Solver():
+    """
+    DPLL over a ClauseDatabase. Clauses are never copied, instead every
+    assignment goes on a trail, and backtracking undoes the trail back to
+    where the guess being backtracked was made.
+    Units are found with two watched literals: every clause watches its
+    first two literals, and only clauses watching a literal that just
+    became false are looked at, which either find another literal to
+    watch or are units. Watched literals are swapped to the front of the
+    clause, so this reorders literals within clauses in the database.
+    Units are propagated until there are none left, then the heuristic
+    picks a literal to guess, and its negation is tried if that fails.
+    The atoms of a clause that ends up false are bumped in the heuristic
+    """
+
+    def __init__(self, clauses: ClauseDatabase,
+                 heuristic: Type[Heuristic] = VSIDSHeuristic) -> None:
+        self._clauses = clauses
+        atoms = clauses.atoms
+        # 1 if the literal is true, -1 if false, 0 if unassigned
+        self._values = [0] * (2 * len(atoms))
+        self._trail: List[int] = []
+        # Clause that forced every atom, -1 for guesses and unit clauses
+        self._reasons = [-1] * len(atoms)
+        # Trail position of the next assignment to propagate
+        self._head = 0
+        self._heuristic = heuristic(clauses, self._values)
+        # Clauses watching every literal
+        self._watches: List[List[int]] = [[] for _ in self._values]
+        # Unit clauses, and whether there is an empty one
+        self._units: List[int] = []
+        self._empty = False
+        literals = clauses.literals
+        starts = clauses.starts
+        for index in range(len(clauses)):
+            start = starts[index]
+            end = starts[index + 1]
+            if end - start == 0:
+                self._empty = True
+            elif end - start == 1:
+                self._units.append(literals[start])
+            else:
+                self._watches[literals[start]].append(index)
+                self._watches[literals[start + 1]].append(index)
 
     @staticmethod
-    def solve(input: List[List[Literal]]) -> List[Tuple[str, bool]]:
+    def solve(input: List[List[Literal]], learning: bool = False,
+              heuristic: Type[Heuristic] = VSIDSHeuristic
+              ) -> List[Tuple[str, bool]]:
         """
         Returns a list of all evaluates values.
         If there is no way to satisfy the constraints, return None
+        Learning solves with CDCLSolver instead of DPLL
         """
-        start = Solver._determine_guess(input)
-        result = Solver._solve_step(input, start[1][0], start[1][1])
-        if result is None:
-            negated = not start[1][1]
-            result = Solver._solve_step(input, start[1][0], negated)
-        return result
+        clauses = ClauseDatabase.from_sentences(input)
+        if learning:
+            return CDCLSolver(clauses, heuristic).search()
+        return Solver(clauses, heuristic).search()
 
-    @staticmethod
-    def _solve_step(sentences: List[List[Literal]],
-                    atom: str, value: bool) -> List[Tuple[str, bool]]:
+    def search(self) -> List[Tuple[str, bool]]:
         """
-        Returns a list of all evaluates values.
-        If there is an error, returns none
-        """
-        # Copy and filter out False literals
-        evaluated = [[Literal(y.atom, y.negation) for y in x if y.evaluate(
-            atom, value) != False] for x in sentences]
-        # Check for empty values. If they exist, we cannot continue down this
-        # path
-        for sentence in evaluated:
-            if len(sentence) == 0:
-                return None
-        # Filter out sentences which have been completed.
-        copied = []
-        for sentence in evaluated:
-            new_sentence = []
-            for literal in sentence:
-                evaluated = literal.evaluate(atom, value)
-                if evaluated == True:
-                    # Because all sentences are ORs, only one value needs to be true for the sentence to be true
-                    # This sets the new sentence length to zero, essentially
-                    # removing it
-                    new_sentence = []
-                    break
-                if evaluated is None:
-                    new_sentence.append(literal)
-            if len(new_sentence) != 0:
-                copied.append(new_sentence)
-        if len(copied) == 0:
-            return [[atom, value]]
-        decision = Solver._determine_guess(copied)
-        result = Solver._solve_step(copied, decision[1][0], decision[1][1])
-        if result is None and decision[0]:
-            # We guessed based on a literal
-            # Guessing the negation means that the literal has to be unsatisfiable
-            # We need to further backtrack
+        Returns every atom the search assigned and its value,
+        or None if the clauses can't be satisfied
+        """
+        if not self._assign_units():
             return None
-        if result is None:
-            # We can try again
-            negated_guess = not decision[1][1]
-            result = Solver._solve_step(copied, decision[1][0], negated_guess)
-        if result is None:
+        # [trail length before the guess, guess, whether it was flipped]
+        guesses = []
+        while True:
+            conflict = self._propagate()
+            if conflict != -1:
+                clauses = self._clauses
+                for position in range(clauses.starts[conflict],
+                                      clauses.starts[conflict + 1]):
+                    self._heuristic.bump(clauses.literals[position] >> 1)
+                self._heuristic.decay()
+                if not self._backtrack(guesses):
+                    return None
+                continue
+            literal = self._heuristic.decide()
+            if literal == -1:
+                return self._assignment()
+            guesses.append([len(self._trail), literal, False])
+            self._assign(literal)
+
+    def _assign_units(self) -> bool:
+        """
+        Assigns the unit clauses before searching.
+        Returns False if they contradict, or there is an empty clause
+        """
+        if self._empty:
+            return False
+        for literal in self._units:
+            if self._values[literal] == -1:
+                return False
+            if self._values[literal] == 0:
+                self._assign(literal)
+        return True
+
+    def _assignment(self) -> List[Tuple[str, bool]]:
+        atoms = self._clauses.atoms
+        return [(atoms[x >> 1], x & 1 == 0) for x in self._trail]
+
+    def _propagate(self) -> int:
+        """
+        Assigns units until there are none left.
+        Returns a clause that ended up with every literal false, or -1
+        """
+        literals = self._clauses.literals
+        starts = self._clauses.starts
+        values = self._values
+        watches = self._watches
+        trail = self._trail
+        while self._head < len(trail):
+            false = trail[self._head] ^ 1
+            self._head += 1
+            watching = watches[false]
+            kept = 0
+            index = 0
+            while index < len(watching):
+                clause = watching[index]
+                index += 1
+                start = starts[clause]
+                # Keep the false literal second
+                if literals[start] == false:
+                    literals[start] = literals[start + 1]
+                    literals[start + 1] = false
+                first = literals[start]
+                if values[first] != 1:
+                    for position in range(start + 2, starts[clause + 1]):
+                        other = literals[position]
+                        if values[other] != -1:
+                            literals[start + 1] = other
+                            literals[position] = false
+                            watches[other].append(clause)
+                            break
+                    else:
+                        other = -1
+                    if other != -1:
+                        continue
+                watching[kept] = clause
+                kept += 1
+                if values[first] == -1:
+                    # Conflict, keep the watches not looked at yet
+                    while index < len(watching):
+                        watching[kept] = watching[index]
+                        kept += 1
+                        index += 1
+                    del watching[kept:]
+                    return clause
+                if values[first] == 0:
+                    self._assign(first, clause)
+            del watching[kept:]
+        return -1
+
+    def _assign(self, literal: int, reason: int = -1) -> None:
+        self._reasons[literal >> 1] = reason
+        self._values[literal] = 1
+        self._values[literal ^ 1] = -1
+        self._trail.append(literal)
+
+    def _undo(self, length: int) -> None:
+        """
+        Unassigns everything after the first length literals on the trail
+        """
+        values = self._values
+        trail = self._trail
+        unassigned = self._heuristic.unassigned
+        while len(trail) > length:
+            literal = trail.pop()
+            values[literal] = 0
+            values[literal ^ 1] = 0
+            unassigned(literal)
+        self._head = min(self._head, length)
+
+    def _backtrack(self, guesses: List[list]) -> bool:
+        """
+        Undoes guesses until one can be flipped, and flips it.
+        Returns False if every guess was already flipped
+        """
+        while len(guesses) > 0:
+            length, literal, flipped = guesses.pop()
+            self._undo(length)
+            if not flipped:
+                guesses.append([length, literal ^ 1, True])
+                self._assign(literal ^ 1)
+                return True
+        return False
+
+
+class CDCLSolver(Solver):
+    """
+    Conflict driven clause learning on top of the DPLL solver's
+    propagation and heuristics.
+    A conflict is analysed back to its first unique implication point,
+    the clause learnt from it is added to the database, and the search
+    jumps back to the second highest level in that clause, where the
+    clause is a unit.
+    Learnt clauses have activities that are bumped when they take part
+    in a conflict, and decay over time, and so do atoms in the heuristic.
+    The search restarts after a number of conflicts that follows the
+    Luby sequence, and if there are too many learnt clauses by then,
+    the less active half of them is deleted, except binary ones
+    """
+
+    restart_base = 100
+    decay = 0.999
+
+    def __init__(self, clauses: ClauseDatabase,
+                 heuristic: Type[Heuristic] = VSIDSHeuristic) -> None:
+        super().__init__(clauses, heuristic)
+        atoms = len(clauses.atoms)
+        # Guess level of every atom
+        self._levels = [0] * atoms
+        # Trail length at the start of every guess level
+        self._starts: List[int] = []
+        # Clauses from _original on are learnt
+        self._original = len(clauses)
+        # Activity of every learnt clause, from _original on
+        self._activities: List[float] = []
+        self._increment = 1.0
+        self._max_learnts = max(len(clauses) / 3, 100)
+        self._seen = [False] * atoms
+
+    def search(self) -> List[Tuple[str, bool]]:
+        """
+        Returns every atom the search assigned and its value,
+        or None if the clauses can't be satisfied
+        """
+        if not self._assign_units():
             return None
-        result.append([atom, value])
-        return result
+        conflicts = 0
+        restarts = 1
+        limit = self.restart_base
+        while True:
+            conflict = self._propagate()
+            if conflict != -1:
+                if len(self._starts) == 0:
+                    return None
+                learnt, level = self._analyse(conflict)
+                self._backjump(level)
+                self._learn(learnt)
+                self._increment /= self.decay
+                self._heuristic.decay()
+                conflicts += 1
+                continue
+            if conflicts >= limit:
+                conflicts = 0
+                restarts += 1
+                limit = self.restart_base * _luby(restarts)
+                self._backjump(0)
+                if len(self._activities) > self._max_learnts:
+                    self._reduce()
+                continue
+            literal = self._heuristic.decide()
+            if literal == -1:
+                return self._assignment()
+            self._starts.append(len(self._trail))
+            self._assign(literal)
+
+    def _assign(self, literal: int, reason: int = -1) -> None:
+        self._levels[literal >> 1] = len(self._starts)
+        super()._assign(literal, reason)
+
+    def _analyse(self, conflict: int) -> Tuple[List[int], int]:
+        """
+        Resolves the conflict clause with the reasons of the literals
+        assigned at the current level, latest first, until only one of
+        them is left. Returns the learnt clause, with that literal first,
+        and the level to jump back to
+        """
+        literals = self._clauses.literals
+        starts = self._clauses.starts
+        levels = self._levels
+        reasons = self._reasons
+        trail = self._trail
+        seen = self._seen
+        level = len(self._starts)
+        learnt = [-1]
+        # Literals seen at the current level and not resolved yet
+        count = 0
+        index = len(trail) - 1
+        clause = conflict
+        implied = -1
+        while True:
+            self._bump(clause)
+            for position in range(starts[clause], starts[clause + 1]):
+                literal = literals[position]
+                atom = literal >> 1
+                if atom == implied or seen[atom] or levels[atom] == 0:
+                    continue
+                seen[atom] = True
+                self._heuristic.bump(atom)
+                if levels[atom] == level:
+                    count += 1
+                else:
+                    learnt.append(literal)
+            while not seen[trail[index] >> 1]:
+                index -= 1
+            implied = trail[index] >> 1
+            index -= 1
+            seen[implied] = False
+            count -= 1
+            if count == 0:
+                break
+            clause = reasons[implied]
+        learnt[0] = trail[index + 1] ^ 1
+        back = 0
+        for position in range(1, len(learnt)):
+            seen[learnt[position] >> 1] = False
+            # Keep the literal from the highest level second, so it's watched
+            if levels[learnt[position] >> 1] > back:
+                back = levels[learnt[position] >> 1]
+                learnt[1], learnt[position] = learnt[position], learnt[1]
+        return learnt, back
+
+    def _backjump(self, level: int) -> None:
+        """
+        Undoes every guess level above level
+        """
+        if level < len(self._starts):
+            self._undo(self._starts[level])
+            del self._starts[level:]
+
+    def _learn(self, learnt: List[int]) -> None:
+        """
+        Adds a learnt clause, and assigns its first literal,
+        which is the only one not false after jumping back
+        """
+        if len(learnt) == 1:
+            self._assign(learnt[0])
+            return
+        clause = self._clauses.add_clause(learnt)
+        self._watches[learnt[0]].append(clause)
+        self._watches[learnt[1]].append(clause)
+        self._activities.append(0.0)
+        self._bump(clause)
+        self._assign(learnt[0], clause)
+
+    def _bump(self, clause: int) -> None:
+        """
+        Bumps the activity of a learnt clause. Activities are scaled
+        down when they get too big, which keeps their order
+        """
+        if clause < self._original:
+            return
+        activities = self._activities
+        activities[clause - self._original] += self._increment
+        if activities[clause - self._original] > 1e20:
+            for index in range(len(activities)):
+                activities[index] *= 1e-20
+            self._increment *= 1e-20
+
+    def _reduce(self) -> None:
+        """
+        Deletes the less active half of the learnt clauses, other than
+        binary ones, and rebuilds the watches. Only called at level 0,
+        where no assignment's reason is looked at again
+        """
+        clauses = self._clauses
+        original = self._original
+        activities = self._activities
+        order = sorted(range(len(activities)), key=lambda x: activities[x])
+        deleted = set(x for x in order[:len(order) // 2]
+                      if len(clauses.clause(original + x)) > 2)
+        kept = [(clauses.clause(original + x), activities[x])
+                for x in range(len(activities)) if x not in deleted]
+        clauses.truncate(original)
+        self._activities = []
+        for literals, activity in kept:
+            clauses.add_clause(literals)
+            self._activities.append(activity)
+        for literal in self._trail:
+            self._reasons[literal >> 1] = -1
+        literals = clauses.literals
+        starts = clauses.starts
+        for watching in self._watches:
+            watching.clear()
+        for index in range(len(clauses)):
+            if starts[index + 1] - starts[index] > 1:
+                self._watches[literals[starts[index]]].append(index)
+                self._watches[literals[starts[index] + 1]].append(index)
+        self._max_learnts *= 1.1
 
-    @staticmethod
-    def _determine_guess(
-            sentences: List[List[Literal]]) -> Tuple[bool, Tuple[str, bool]]:
-        """
-        Determines which value to guess
-        First bool is true if it is a literal
-        If not, we pick the lowest lexicographic order atom
-        And guess True
-        """
-        literals = [x[0] for x in sentences if len(x) == 1]
-        if len(literals) != 0:
-            literals.sort(key=lambda x: x.atom)
-            selected = literals[0]
-            if selected.negation:
-                return [True, [selected.atom, False]]
-            return [True, [selected.atom, True]]
-        atoms = [atom for atom in chain.from_iterable(sentences)]
-        atoms.sort(key=lambda x: x.atom)
-        selected = atoms[0]
-        return [False, [selected.atom, True]]
+
+def _luby(index: int) -> int:
+    """
+    The index-th number, from 1, of the Luby sequence 1 1 2 1 1 2 4 1 ...
+    """
+    while True:
+        bits = index.bit_length()
+        if index == (1 << bits) - 1:
+            return 1 << (bits - 1)
+        index -= (1 << (bits - 1)) - 1
 
 
 if __name__ == '__main__':
@@ -110,10 +422,49 @@ if __name__ == '__main__':
         description='Solves a CNF input file'
     )
     parser.add_argument('filename', help='CNF input file')
+    parser.add_argument(
+        '-d',
+        '--decisions',
+        help='How to pick the atom to guess. vsids guesses the atom most '
+             'involved in recent conflicts, with the value it had last, '
+             'lexicographic guesses the lowest atom by name True, which '
+             'reproduces the results of earlier versions. Default is vsids',
+        choices=list(heuristics),
+        default='vsids')
+    parser.add_argument(
+        '-m',
+        '--mode',
+        help='Plain DPLL, or conflict driven clause learning with '
+             'backjumping and restarts. Default is dpll',
+        choices=['dpll', 'cdcl'],
+        default='dpll')
+    parser.add_argument(
+        '-D',
+        '--dimacs',
+        help='Reads the input as DIMACS CNF, and prints the result the way '
+             'DIMACS solvers do, as an s line and a v line. Default is false',
+        action='store_true',
+        default=False)
     args = parser.parse_args()
     file = args.filename
-    sentences = SolverParser.parse(file)
-    result = Solver.solve(sentences)
+    if args.dimacs:
+        try:
+            clauses = DimacsParser.parse(file)
+        except DimacsException as e:
+            parser.error(str(e))
+    else:
+        clauses = ClauseDatabase.from_sentences(SolverParser.parse(file))
+    solver = CDCLSolver if args.mode == 'cdcl' else Solver
+    result = solver(clauses, heuristics[args.decisions]).search()
+    if args.dimacs:
+        if result is None:
+            print('s UNSATISFIABLE')
+            exit()
+        print('s SATISFIABLE')
+        result.sort(key=lambda x: int(x[0]))
+        print('v {} 0'.format(' '.join(
+            i[0] if i[1] else '-' + i[0] for i in result)))
+        exit()
     if result is None:
         print('NO VALID ASSIGNMENT')
         exit()